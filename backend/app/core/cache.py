@@ -0,0 +1,129 @@
+import json
+import time
+
+from collections import OrderedDict
+from typing import Type
+
+from app.core.settings import EnvCacheSettings
+from app.core.metrics import CACHE_LOOKUPS
+from app.schemas.mapper import ModelT
+
+
+class LRUCache:
+    name = "memory"
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._hit_metric = CACHE_LOOKUPS.labels(self.name, "hit")
+        self._miss_metric = CACHE_LOOKUPS.labels(self.name, "miss")
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    async def get(self, key: str):
+        if (entry := self._entries.get(key)) is None:
+            self.misses += 1
+            self._miss_metric.inc()
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            self._miss_metric.inc()
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self._hit_metric.inc()
+        return value
+
+    async def set(self, key: str, value, ttl_seconds: float | None = None):
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def restore(self, model: Type[ModelT], value: dict) -> ModelT:
+        # Entries are dicts dumped from validated models and never leave the process.
+        return model.construct(**value)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache:
+    name = "redis"
+
+    def __init__(self, url: str, ttl_seconds: int):
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package")
+
+        self.max_size = None
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._hit_metric = CACHE_LOOKUPS.labels(self.name, "hit")
+        self._miss_metric = CACHE_LOOKUPS.labels(self.name, "miss")
+        self._errors = redis.RedisError
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str):
+        try:
+            raw = await self._client.get(key)
+        except self._errors:
+            raw = None
+        if raw is None:
+            self.misses += 1
+            self._miss_metric.inc()
+            return None
+        self.hits += 1
+        self._hit_metric.inc()
+        return json.loads(raw)
+
+    async def set(self, key: str, value, ttl_seconds: float | None = None):
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        try:
+            await self._client.set(key, json.dumps(value, default=str), px=int(ttl_seconds * 1000))
+        except self._errors:
+            pass
+
+    async def delete(self, *keys: str):
+        if not keys:
+            return
+        try:
+            await self._client.delete(*keys)
+        except self._errors:
+            pass
+
+    def restore(self, model: Type[ModelT], value: dict) -> ModelT:
+        # JSON turns dates into strings, so values coming back from Redis need a real parse.
+        return model.parse_obj(value)
+
+    def size(self) -> int | None:
+        return None
+
+
+def create_cache(settings: EnvCacheSettings) -> LRUCache | RedisCache:
+    if settings.backend == "redis":
+        if not settings.redis_url:
+            raise RuntimeError("CACHE_BACKEND=redis requires CACHE_REDIS_URL")
+        return RedisCache(settings.redis_url, settings.ttl_seconds)
+    return LRUCache(settings.max_size, settings.ttl_seconds)
+
+
+def book_key(book_id: int) -> str:
+    return f"book:{book_id}"
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+cache = create_cache(EnvCacheSettings())
@@ -1,12 +1,18 @@
-from fastapi import HTTPException, status
-from sqlalchemy import text
+import time
+import functools
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import text, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from sqlalchemy.exc import StatementError, IntegrityError
 
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
-from app.core.settings import DB_ENGINE, Base
+from app.core.settings import DB_ENGINE, Base, replica_settings
+from app.core.replicas import replicas
 
 from app.methods.error_handler import sql_validation_error
 
@@ -18,11 +24,103 @@ async def check_connection():
         await session.execute(query)
         await session.commit()
 
-async def get_async_session():
+
+PIN_COOKIE = "db_pinned_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def pin_reads(response: Response):
+    # Replicas may lag behind a commit, so the client reads from the primary for a short while.
+    pinned_until = int(time.time()) + replica_settings.pin_seconds
+    response.set_cookie(PIN_COOKIE, str(pinned_until), max_age=replica_settings.pin_seconds,
+                        httponly=True, samesite="lax")
+
+
+class ReadPinMiddleware:
+    # Routes may build their own Response, so the pin cookie goes on whatever is actually sent.
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message: Message):
+            if message["type"] == "http.response.start" and scope.get("state", {}).get("pin_reads"):
+                pin = Response()
+                pin_reads(pin)
+                MutableHeaders(scope=message).append("set-cookie", pin.headers["set-cookie"])
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
+
+
+def reads_pinned(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_async_session(request: Request):
     async with AsyncSession(DB_ENGINE, expire_on_commit=False) as session:
+        if replicas.engines and request.method not in SAFE_METHODS:
+            event.listen(session.sync_session, "after_commit", lambda _: setattr(request.state, "pin_reads", True))
         try:
             yield session
         except IntegrityError as database_error:
             await session.rollback()
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail=sql_validation_error(database_error))
+
+
+@functools.cache
+def autocommit_engine(engine: AsyncEngine) -> AsyncEngine:
+    # Plain SELECTs need no transaction, which saves the BEGIN and COMMIT round trips.
+    return engine.execution_options(isolation_level="AUTOCOMMIT")
+
+
+@functools.cache
+def snapshot_engine(engine: AsyncEngine) -> AsyncEngine:
+    return engine.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True)
+
+
+def reads_replica(session: AsyncSession) -> bool:
+    # Rows read from a lagging replica may predate a committed write, so they must not be cached
+    # past the read pin. Engines derived through execution_options share their parent's pool.
+    pool = session.bind.sync_engine.pool
+    return any(pool is replica.sync_engine.pool for replica in replicas.engines)
+
+
+def choose_read_engine(request: Request) -> AsyncEngine:
+    if not reads_pinned(request) and (replica := replicas.choose()) is not None:
+        return replica
+    return DB_ENGINE
+
+
+class ReadSession(AsyncSession):
+    # Results come back fully buffered, so in autocommit mode the connection goes back to the
+    # pool after every statement instead of staying checked out until the response is sent.
+    async def execute(self, *args, **kwargs):
+        try:
+            return await super().execute(*args, **kwargs)
+        finally:
+            await self.close()
+
+    async def scalar(self, *args, **kwargs):
+        try:
+            return await super().scalar(*args, **kwargs)
+        finally:
+            await self.close()
+
+
+async def get_read_session(request: Request):
+    async with ReadSession(autocommit_engine(choose_read_engine(request)), expire_on_commit=False) as session:
+        yield session
+
+
+async def get_snapshot_session(request: Request):
+    # Server-side cursors need a transaction; a read-only snapshot also keeps long exports consistent.
+    async with AsyncSession(snapshot_engine(choose_read_engine(request)), expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,106 @@
+import json
+import time
+import logging
+
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_PREVIEW = 200
+
+
+class RequestSQLStats:
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: str | None = None
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float):
+        shape = " ".join(statement.split())
+        self.count += 1
+        self.total_seconds += seconds
+        self.shapes[shape] += 1
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = shape
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        return {shape[:STATEMENT_PREVIEW]: count for shape, count in self.shapes.items() if count > threshold}
+
+    def server_timing(self) -> str:
+        return (f'db;desc="{self.count} queries";dur={self.total_seconds * 1000:.2f}, '
+                f'db-slowest;dur={self.slowest_seconds * 1000:.2f}')
+
+
+_request_stats: ContextVar[RequestSQLStats | None] = ContextVar("request_sql_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None:
+        conn.info.setdefault("sql_trace_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if (stats := _request_stats.get()) is not None and (started := conn.info.get("sql_trace_started_at")):
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+def install_sql_trace():
+    # Listening on the Engine class covers the primary, replica and background engines alike.
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class SQLTraceMiddleware:
+    def __init__(self, app: ASGIApp, repeat_threshold: int = 5):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSQLStats()
+        token = _request_stats.set(stats)
+        status_code = None
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            self._log(scope, status_code, stats)
+
+    def _log(self, scope: Scope, status_code: int | None, stats: RequestSQLStats):
+        repeated = stats.repeated(self.repeat_threshold)
+        line = json.dumps({
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "queries": stats.count,
+            "db_ms": round(stats.total_seconds * 1000, 2),
+            "slowest_ms": round(stats.slowest_seconds * 1000, 2),
+            "slowest": (stats.slowest_statement or "")[:STATEMENT_PREVIEW] or None,
+            "repeated": repeated or None,
+        }, ensure_ascii=False)
+        if repeated:
+            logger.warning("Possible N+1 queries: %s", line)
+        else:
+            logger.info("SQL trace: %s", line)
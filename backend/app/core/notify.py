@@ -0,0 +1,79 @@
+import asyncio
+import logging
+
+from typing import Callable
+
+import asyncpg
+
+from app.core.settings import DB_ENGINE
+
+
+logger = logging.getLogger(__name__)
+
+CONNECTION_ERRORS = (OSError, asyncpg.PostgresError, asyncpg.InterfaceError)
+
+
+class PgListener:
+    def __init__(self, dsn: str, max_reconnect_delay: float = 30.0):
+        self._dsn = dsn
+        self._max_reconnect_delay = max_reconnect_delay
+        self._callbacks: dict[str, list[Callable[[str], None]]] = {}
+        self._subscribed_callbacks: list[Callable[[], None]] = []
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self, channel: str, callback: Callable[[str], None],
+                  on_subscribed: Callable[[], None] | None = None):
+        self._callbacks.setdefault(channel, []).append(callback)
+        if on_subscribed is not None:
+            self._subscribed_callbacks.append(on_subscribed)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        delay = 1.0
+        while True:
+            try:
+                connection = await asyncpg.connect(self._dsn)
+            except CONNECTION_ERRORS as error:
+                logger.warning("LISTEN connection failed: %s", error)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self._max_reconnect_delay)
+                continue
+
+            delay = 1.0
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda _: closed.set())
+            try:
+                for channel in self._callbacks:
+                    await connection.add_listener(channel, self._dispatch)
+                # Notifications sent before LISTEN was registered are lost for good, both between a
+                # subscriber's initial load and the first connection and while we were disconnected.
+                for callback in self._subscribed_callbacks:
+                    callback()
+                await closed.wait()
+            except CONNECTION_ERRORS as error:
+                logger.warning("LISTEN connection failed: %s", error)
+            finally:
+                connection.terminate()
+            logger.warning("LISTEN connection lost, reconnecting")
+
+    def _dispatch(self, connection, pid: int, channel: str, payload: str):
+        for callback in self._callbacks.get(channel, ()):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("Notification handler for %s failed", channel)
+
+
+listener = PgListener(DB_ENGINE.url.set(drivername="postgresql").render_as_string(hide_password=False))
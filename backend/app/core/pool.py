@@ -0,0 +1,42 @@
+import time
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import DB_POOL_CHECKOUTS, DB_POOL_TIMEOUTS, DB_POOL_WAIT, DB_POOL_CHECKED_OUT
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        name = getattr(self, "logging_name", None) or "default"
+        self._checkouts_metric = DB_POOL_CHECKOUTS.labels(name)
+        self._timeouts_metric = DB_POOL_TIMEOUTS.labels(name)
+        self._wait_metric = DB_POOL_WAIT.labels(name)
+        self._checked_out_metric = DB_POOL_CHECKED_OUT.labels(name)
+
+    def connect(self):
+        started_at = time.perf_counter()
+        try:
+            connection = super().connect()
+        except TimeoutError:
+            self.timeouts += 1
+            self._timeouts_metric.inc()
+            raise
+        finally:
+            waited = time.perf_counter() - started_at
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self._checkouts_metric.inc()
+            self._wait_metric.observe(waited)
+        self._checked_out_metric.set(self.checkedout())
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._checked_out_metric.set(self.checkedout())
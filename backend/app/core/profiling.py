@@ -0,0 +1,73 @@
+import re
+import hmac
+import time
+import random
+import logging
+
+from pathlib import Path
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.settings import EnvProfilingSettings
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_SUFFIX = ".speedscope.json"
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, settings: EnvProfilingSettings):
+        try:
+            from pyinstrument import Profiler
+            from pyinstrument.renderers import SpeedscopeRenderer
+        except ImportError:
+            raise RuntimeError("PROFILING_ENABLED=true requires the pyinstrument package")
+
+        self.app = app
+        self.settings = settings
+        self.directory = Path(settings.directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._profiler = Profiler
+        self._renderer = SpeedscopeRenderer
+
+    def _requested(self, scope: Scope) -> bool:
+        if self.settings.token and (token := Headers(scope=scope).get(PROFILE_HEADER)):
+            return hmac.compare_digest(token, self.settings.token)
+        return random.random() < self.settings.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = self._profiler(interval=self.settings.interval_seconds, async_mode="enabled")
+        started_at = time.time()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+            name = profile_name(scope["method"], scope["path"], started_at, time.time() - started_at)
+            # Rendering walks the whole call tree, so it stays off the event loop.
+            await anyio.to_thread.run_sync(self._save, profiler, name)
+
+    def _save(self, profiler, name: str):
+        try:
+            (self.directory / name).write_text(profiler.output(self._renderer()), encoding="utf-8")
+        except OSError as error:
+            logger.warning("Could not save profile %s: %s", name, error)
+            return
+
+        profiles = sorted(self.directory.glob("*" + PROFILE_SUFFIX))
+        for stale in profiles[:-self.settings.max_profiles]:
+            stale.unlink(missing_ok=True)
+
+
+def profile_name(method: str, path: str, started_at: float, duration: float) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-") or "root"
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(started_at)) + f"{started_at % 1:.3f}"[1:]
+    return f"{stamp}-{method}-{slug}-{duration * 1000:.0f}ms{PROFILE_SUFFIX}"
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import itertools
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.settings import REPLICA_DB_ENGINES, replica_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    def __init__(self, engines: list[AsyncEngine], balancing: str = "round_robin"):
+        if balancing not in ("round_robin", "least_connections"):
+            raise RuntimeError(f"Unknown REPLICA_BALANCING={balancing}")
+        self.engines = engines
+        self.balancing = balancing
+        self.healthy = list(engines)
+        self._turn = itertools.count()
+
+    def choose(self) -> AsyncEngine | None:
+        if not (healthy := self.healthy):
+            return None
+        if self.balancing == "least_connections":
+            return min(healthy, key=lambda engine: engine.pool.checkedout())
+        return healthy[next(self._turn) % len(healthy)]
+
+    def is_healthy(self, engine: AsyncEngine) -> bool:
+        return engine in self.healthy
+
+    async def _ping(self, engine: AsyncEngine, timeout: float) -> bool:
+        try:
+            async with engine.connect() as connection:
+                await asyncio.wait_for(connection.execute(text("SELECT 1;")), timeout)
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError) as error:
+            logger.warning("Replica %s is unavailable: %s", engine.url.host, error)
+            return False
+        return True
+
+    async def check_health(self, timeout: float):
+        results = await asyncio.gather(*(self._ping(engine, timeout) for engine in self.engines))
+        self.healthy = [engine for engine, healthy in zip(self.engines, results) if healthy]
+
+    async def run_health_checks(self, interval_seconds: float):
+        while True:
+            await self.check_health(interval_seconds)
+            await asyncio.sleep(interval_seconds)
+
+
+replicas = ReplicaSet(REPLICA_DB_ENGINES, replica_settings.balancing)
@@ -0,0 +1,79 @@
+import json
+import asyncio
+import logging
+
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import BACKGROUND_DB_ENGINE, EnvJWTSettings
+
+from app.crud import revoked_tokens
+
+
+logger = logging.getLogger(__name__)
+
+REVOKED_TOKENS_CHANNEL = "revoked_tokens"
+
+
+class RevocationList:
+    def __init__(self, prune_interval_seconds: int):
+        self.prune_interval_seconds = prune_interval_seconds
+        # jti -> token expiry; membership checks on the request path are a single dict lookup.
+        self._revoked: dict[str, datetime] = {}
+        self._wakeup = asyncio.Event()
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def add(self, jti: str, expires_at: datetime):
+        if expires_at > datetime.now(timezone.utc):
+            self._revoked[jti] = expires_at
+
+    def on_revoked(self, payload: str):
+        event = json.loads(payload)
+        self.add(event["jti"], datetime.fromisoformat(event["expires_at"]))
+
+    def reload(self):
+        # Revocations notified while the listener was not subscribed are only visible in the table.
+        self._wakeup.set()
+
+    async def revoke(self, session: AsyncSession, jti: str, expires_at: datetime):
+        await revoked_tokens.revoke_token(session, jti, expires_at)
+        self.add(jti, expires_at)
+
+    async def load(self):
+        async with AsyncSession(BACKGROUND_DB_ENGINE) as session:
+            loaded = await revoked_tokens.get_active_revoked_tokens(session)
+        # Merged rather than replaced: a revocation notified while the SELECT ran may have committed
+        # after its snapshot. Entries only ever leave by expiring.
+        self._revoked.update(loaded)
+        self.prune()
+
+    def prune(self):
+        now = datetime.now(timezone.utc)
+        self._revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.prune_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            # Cleared before loading, so a reload requested meanwhile triggers another pass.
+            self._wakeup.clear()
+            try:
+                # Every worker prunes; the DELETE is idempotent and the reload drops expired entries from memory.
+                async with AsyncSession(BACKGROUND_DB_ENGINE) as session:
+                    await revoked_tokens.delete_expired_revoked_tokens(session)
+                await self.load()
+            except (SQLAlchemyError, OSError) as error:
+                logger.warning("Revoked token refresh failed: %s", error)
+                self.prune()
+
+
+revocations = RevocationList(EnvJWTSettings().revocation_prune_interval_seconds)
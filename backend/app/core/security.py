@@ -1,102 +1,144 @@
-import json
+import time
+import uuid
+import asyncio
+import hashlib
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 from jose import JWTError, jwt
-from fastapi import Depends
+from fastapi import Depends, HTTPException, status
 
 from passlib.context import CryptContext
-from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
-
-from app.core.settings import EnvJWTSettings
-from app.schemas.tokens import TokenData
-from app.crud.users import UserMethods
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import EnvJWTSettings, EnvPasswordSettings
+from app.core.metrics import PASSWORD_HASH_DURATION
+from app.core.cache import LRUCache
+from app.core.revocation import revocations
+from app.core.db_conn import get_read_session
+from app.crud import users
+from app.schemas.tokens import Token, TokenClaims
 from app.schemas.users import UserDBModel
 
 settings = EnvJWTSettings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_settings = EnvPasswordSettings()
+pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=password_settings.bcrypt_rounds, deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+class ClaimsCache(LRUCache):
+    # Its own metric label keeps token lookups out of the book/user cache hit ratio.
+    name = "jwt_claims"
+
+
+# Verified claims stay in process memory until the token expires, so authentication needs no DB round trip.
+claims_cache = ClaimsCache(settings.claims_cache_size, int(settings.token_expire_minutes) * 60)
+
+# bcrypt releases the GIL, so a small thread pool hashes in parallel without blocking the event loop.
+hash_executor = ThreadPoolExecutor(max_workers=password_settings.workers, thread_name_prefix="bcrypt")
+hash_slots = asyncio.Semaphore(password_settings.max_concurrency)
+
+
+def _timed(operation: str, func, *args):
+    started_at = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        PASSWORD_HASH_DURATION.labels(operation).observe(time.perf_counter() - started_at)
+
+
+async def _run_hashing(operation: str, func, *args):
+    try:
+        await asyncio.wait_for(hash_slots.acquire(), password_settings.queue_timeout_seconds)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server is busy, try again later")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(hash_executor, _timed, operation, func, *args)
+    finally:
+        hash_slots.release()
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing("verify", pwd_context.verify, plain_password, hashed_password)
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await _run_hashing("verify", pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash(password: str) -> str:
+    return await _run_hashing("hash", pwd_context.hash, password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=30)
-    to_encode.update({"exp": expire})
+        expire = datetime.now(timezone.utc) + timedelta(minutes=30)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(
         to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 
-def check_access_token(auth_model: TokenData, *args, **kwargs):
-    user = UserMethods.get_user_by_email(auth_model.email)
-    if user.status_code != 200:
-        return JSONResponse(
-            status_code=403,
-            content={"details": "User not found"}
-        )
-    user = UserDBModel.parse_obj(json.loads(user.body.decode("utf-8"))["user"])
-    if auth_model.access_token == user.access_token:
-        user.time_token_create = user.time_token_create[1:-1]
-        tokenTime = datetime.fromisoformat(user.time_token_create)
-        if datetime.now(timezone.utc) - tokenTime > timedelta(minutes=int(settings.token_expire_minutes)):
-            user.access_token = None
-            user.time_token_create = None
-            UserMethods.update_user(user)
-            return JSONResponse(
-                status_code=403,
-                content={"details": "Token is outdated"}
-            )
-        new_token = create_access_token({"sub": auth_model.email}, timedelta(
-            minutes=int(settings.token_expire_minutes)))
-        return JSONResponse(
-            content={"token": new_token})
-    return JSONResponse(
-        status_code=403,
-        content={"details": "Invalid token"}
-    )
-
-
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> JSONResponse:
-    credentials_exception = JSONResponse(
-        status_code=401,
-        content={
-            "details": "Could not validate credentials"
-        },
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+def claims_key(token: str) -> str:
+    return "token:" + hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _credentials_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"})
+
+
+async def get_token_claims(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenClaims:
+    key = claims_key(token)
+    if (claims := await claims_cache.get(key)) is None:
+        try:
+            claims = TokenClaims.parse_obj(
+                jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm]))
+        except (JWTError, ValidationError):
+            raise _credentials_error()
+        if (ttl_seconds := claims.exp - time.time()) > 0:
+            await claims_cache.set(key, claims, ttl_seconds)
+
+    # Checked on every request, cached or not, so a revocation takes effect immediately.
+    if claims.jti in revocations:
+        raise _credentials_error()
+    return claims
+
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)],
+                           claims: Annotated[TokenClaims, Depends(get_token_claims)],
+                           session: AsyncSession = Depends(get_read_session)) -> UserDBModel:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY,
-                             algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-    user = UserMethods.get_user_by_email(email)
-    if user.status_code != 200:
-        raise credentials_exception
+        return await users.get_user_by_id(session, claims.uid)
+    except HTTPException as error:
+        if error.status_code != status.HTTP_404_NOT_FOUND:
+            raise
+    # The token is still valid but its user was deleted, so it must stop authenticating.
+    await claims_cache.delete(claims_key(token))
+    raise _credentials_error()
+
+
+STAFF_USER_TYPES = ("Admin", "Librarian")
+
+
+async def get_current_staff(user: Annotated[UserDBModel, Depends(get_current_user)]) -> UserDBModel:
+    if user.user_type not in STAFF_USER_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="User is not an admin or librarian.")
     return user
 
 
-async def get_current_active_user(
-    current_user: Annotated[JSONResponse, Depends(get_current_user)]
-):
-    if current_user.status_code != 200:
-        return current_user
-    current_user = json.loads(current_user.body.encode["utf-8"])["user"]
-    if current_user["disabled"]:
-        raise JSONResponse(contents={"details": "Inactive user"})
-    return current_user
+async def check_access_token(user: Annotated[UserDBModel, Depends(get_current_user)]) -> Token:
+    # Going through get_current_user stops a deleted user's token from refreshing itself forever.
+    new_token = create_access_token({"sub": user.email, "uid": user.id}, timedelta(
+        minutes=int(settings.token_expire_minutes)))
+    return Token(access_token=new_token)
@@ -1,7 +1,10 @@
 from pydantic import BaseSettings
 
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.pool import TimedQueuePool
 
 
 class EnvDBSettings(BaseSettings):
@@ -10,6 +13,14 @@ class EnvDBSettings(BaseSettings):
     database: str
     host: str
     port: str
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_pre_ping: bool = True
+    pool_recycle: int = 1800
+    # Set both caches to 0 when connecting through pgbouncer in transaction mode.
+    statement_cache_size: int = 100
+    prepared_statement_cache_size: int = 100
 
     class Config:
         env_prefix = "DB_"
@@ -20,13 +31,138 @@ class EnvJWTSettings(BaseSettings):
     secret_key: str
     algorithm: str
     token_expire_minutes: str = "30"
+    claims_cache_size: int = 10000
+    revocation_prune_interval_seconds: int = 300
 
     class Config:
         env_prefix = "JWT_"
         env_file = "app/.env"
 
 
+class EnvPasswordSettings(BaseSettings):
+    # Changing the cost factor rehashes each user's password on their next login.
+    bcrypt_rounds: int = 12
+    workers: int = 4
+    max_concurrency: int = 4
+    queue_timeout_seconds: float = 10.0
+
+    class Config:
+        env_prefix = "PASSWORD_"
+        env_file = "app/.env"
+
+
+class EnvCacheSettings(BaseSettings):
+    backend: str = "memory"
+    max_size: int = 10000
+    ttl_seconds: int = 60
+    redis_url: str | None = None
+
+    class Config:
+        env_prefix = "CACHE_"
+        env_file = "app/.env"
+
+
+class EnvOverdueSettings(BaseSettings):
+    enabled: bool = True
+    interval_seconds: int = 300
+    batch_size: int = 500
+    batch_pause_seconds: float = 0.1
+
+    class Config:
+        env_prefix = "OVERDUE_"
+        env_file = "app/.env"
+
+
+class EnvReservationSettings(BaseSettings):
+    enabled: bool = True
+    ttl_minutes: int = 1440
+    batch_size: int = 500
+
+    class Config:
+        env_prefix = "RESERVATION_"
+        env_file = "app/.env"
+
+
+class EnvSQLTraceSettings(BaseSettings):
+    enabled: bool = False
+    repeat_threshold: int = 5
+
+    class Config:
+        env_prefix = "SQL_TRACE_"
+        env_file = "app/.env"
+
+
+class EnvSlowQuerySettings(BaseSettings):
+    enabled: bool = False
+    threshold_ms: float = 200
+    # off, plain or analyze; ANALYZE is only ever used for SELECT statements.
+    explain: str = "plain"
+    explain_timeout_ms: int = 5000
+    buffer_size: int = 200
+    file: str | None = "slow_queries.ndjson"
+
+    class Config:
+        env_prefix = "SLOW_QUERY_"
+        env_file = "app/.env"
+
+
+class EnvProfilingSettings(BaseSettings):
+    enabled: bool = False
+    # Requests carrying this value in X-Profile-Token are always profiled.
+    token: str | None = None
+    sample_rate: float = 0.0
+    interval_seconds: float = 0.001
+    directory: str = "profiles"
+    max_profiles: int = 200
+
+    class Config:
+        env_prefix = "PROFILING_"
+        env_file = "app/.env"
+
+
+class EnvReplicaSettings(BaseSettings):
+    # Comma-separated host[:port] list; replicas share the primary's credentials and database.
+    hosts: str = ""
+    balancing: str = "round_robin"
+    health_check_interval_seconds: int = 10
+    pin_seconds: int = 5
+
+    class Config:
+        env_prefix = "REPLICA_"
+        env_file = "app/.env"
+
+
 settings = EnvDBSettings()
 DATABASE_URL = f"postgresql+asyncpg://{settings.username}:{settings.password}@{settings.host}:{settings.port}/{settings.database}"
-DB_ENGINE = create_async_engine(DATABASE_URL)
+
+
+def create_db_engine(url: str | URL, db_settings: EnvDBSettings, **kwargs) -> AsyncEngine:
+    options = dict(poolclass=TimedQueuePool,
+                   pool_size=db_settings.pool_size,
+                   max_overflow=db_settings.max_overflow,
+                   pool_timeout=db_settings.pool_timeout,
+                   pool_pre_ping=db_settings.pool_pre_ping,
+                   pool_recycle=db_settings.pool_recycle,
+                   connect_args={
+                       "statement_cache_size": db_settings.statement_cache_size,
+                       "prepared_statement_cache_size": db_settings.prepared_statement_cache_size,
+                   })
+    options.update(kwargs)
+    return create_async_engine(url, **options)
+
+
+DB_ENGINE = create_db_engine(DATABASE_URL, settings, pool_logging_name="default")
+# Background workers get their own small pool so they never wait on, or starve, request traffic.
+BACKGROUND_DB_ENGINE = create_db_engine(DATABASE_URL, settings, pool_size=2, max_overflow=0,
+                                        pool_logging_name="background")
+
+
+def replica_url(host: str) -> URL:
+    host, _, port = host.strip().partition(":")
+    return make_url(DATABASE_URL).set(host=host, port=int(port or settings.port))
+
+
+replica_settings = EnvReplicaSettings()
+REPLICA_DB_ENGINES = [create_db_engine(replica_url(host), settings, pool_logging_name=f"replica-{host.strip()}")
+                      for host in replica_settings.hosts.split(",") if host.strip()]
 Base = declarative_base()
@@ -0,0 +1,123 @@
+import re
+import json
+import time
+import asyncio
+import logging
+
+from collections import deque
+from datetime import datetime, timezone
+
+import anyio
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.settings import BACKGROUND_DB_ENGINE, EnvSlowQuerySettings
+
+
+logger = logging.getLogger(__name__)
+
+REDACTED = "***"
+SECRET_NAME = re.compile(r"password|token|secret|hash", re.IGNORECASE)
+# JWTs and bcrypt hashes are redacted even when bound under an innocent name.
+SECRET_VALUE = re.compile(r"^(eyJ[\w-]+\.[\w-]+\.[\w-]*|\$2[aby]?\$\d\d\$.{53})$")
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "VALUES", "TABLE")
+MAX_VALUE_LENGTH = 200
+
+
+def _redact(name: str | None, value):
+    if name is not None and SECRET_NAME.search(name):
+        return REDACTED
+    if isinstance(value, str):
+        if SECRET_VALUE.match(value):
+            return REDACTED
+        return value[:MAX_VALUE_LENGTH]
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    return str(value)[:MAX_VALUE_LENGTH]
+
+
+def redact_parameters(context, parameters) -> dict | list:
+    compiled = getattr(context, "compiled", None)
+    if compiled is not None and context.compiled_parameters:
+        return {name: _redact(name, value) for name, value in context.compiled_parameters[0].items()}
+    if isinstance(parameters, dict):
+        return {name: _redact(name, value) for name, value in parameters.items()}
+    return [_redact(None, value) for value in parameters or ()]
+
+
+class SlowQueryRecorder:
+    def __init__(self, settings: EnvSlowQuerySettings):
+        self.settings = settings
+        self.threshold_seconds = settings.threshold_ms / 1000
+        self.entries: deque[dict] = deque(maxlen=settings.buffer_size)
+        self._pending: asyncio.Queue | None = None
+
+    def install(self, *engines: AsyncEngine):
+        # The background engine runs the EXPLAINs, so it is never recorded itself.
+        self._pending = asyncio.Queue(maxsize=self.settings.buffer_size)
+        for engine in engines:
+            event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started_at", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not (started := conn.info.get("slow_query_started_at")):
+            return
+        duration = time.perf_counter() - started.pop()
+        if duration < self.threshold_seconds:
+            return
+
+        entry = {
+            "statement": " ".join(statement.split()),
+            "parameters": redact_parameters(context, parameters),
+            "duration_ms": round(duration * 1000, 2),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "host": conn.engine.url.host,
+            "plan": None,
+        }
+        self.entries.append(entry)
+        try:
+            # The raw parameters only live long enough to run the EXPLAIN.
+            self._pending.put_nowait((entry, statement, None if executemany else parameters))
+        except asyncio.QueueFull:
+            logger.warning("Slow query backlog is full, skipping EXPLAIN for %s", entry["statement"][:100])
+
+    async def run(self):
+        while True:
+            entry, statement, parameters = await self._pending.get()
+            if self.settings.explain != "off" and parameters is not None:
+                entry["plan"] = await self._explain(entry["statement"], statement, parameters)
+            await anyio.to_thread.run_sync(self._write, entry)
+
+    async def _explain(self, normalized: str, statement: str, parameters) -> str | None:
+        keyword = normalized.split(" ", 1)[0].upper()
+        if keyword not in EXPLAINABLE:
+            return None
+        # ANALYZE executes the statement, so it is reserved for plain reads and always rolled back.
+        options = "(ANALYZE, BUFFERS)" if self.settings.explain == "analyze" and keyword == "SELECT" else ""
+        try:
+            async with BACKGROUND_DB_ENGINE.connect() as connection:
+                async with connection.begin() as transaction:
+                    await connection.exec_driver_sql(
+                        f"SET LOCAL statement_timeout = {int(self.settings.explain_timeout_ms)}")
+                    result = await connection.exec_driver_sql(f"EXPLAIN {options} {statement}", parameters)
+                    plan = "\n".join(row[0] for row in result.all())
+                    await transaction.rollback()
+        except (SQLAlchemyError, OSError) as error:
+            return f"EXPLAIN failed: {error}"
+        return plan
+
+    def _write(self, entry: dict):
+        if not self.settings.file:
+            return
+        try:
+            with open(self.settings.file, "a", encoding="utf-8") as log_file:
+                log_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except OSError as error:
+            logger.warning("Could not write slow query log: %s", error)
+
+
+slow_queries = SlowQueryRecorder(EnvSlowQuerySettings())
@@ -1,5 +1,5 @@
-from typing import List
-from sqlalchemy import text, select
+from datetime import datetime
+from sqlalchemy import text, select, tuple_
 from fastapi import status
 
 from fastapi.exceptions import HTTPException
@@ -8,45 +8,58 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.book_query import BookQuery
 
-from app.schemas.book_query import BookQueryDBModel, BookQueryModel
+from app.schemas.book_query import BookQueryDBModel, BookQueryModel, BookQueryPage, HoldPosition
+from app.schemas.mapper import RowMapper
 
+from app.core.cache import cache, book_key, user_key
 
-async def get_book_query_by_id(session: AsyncSession, book_query_id: int) -> BookQueryDBModel:
-    query = text("""
+from app.methods.pagination import keyset_select, keyset_page
+
+
+BOOK_QUERY_ROWS = RowMapper(BookQueryDBModel)
+HOLD_ROWS = RowMapper(HoldPosition)
+
+BOOK_QUERY_BY_ID = text("""
                      SELECT *
                      FROM book_queries
                      WHERE id = :id;
                 """)
 
-    result = await session.execute(query, {"id": book_query_id})
+
+async def get_book_query_by_id(session: AsyncSession, book_query_id: int) -> BookQueryDBModel:
+    result = await session.execute(BOOK_QUERY_BY_ID, {"id": book_query_id})
 
     if not (result := result.one_or_none()):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Book query not found")
     
     book_query = result
-    await session.commit()
-    return BookQueryDBModel.from_orm(book_query)
+    return BOOK_QUERY_ROWS(book_query)
 
 
-async def get_book_query_by_user_book_id(session: AsyncSession, user_id: int, book_id: int) -> BookQueryDBModel:
-    query = text("""
+BOOK_QUERY_BY_USER_BOOK_ID = text("""
             SELECT *
             FROM book_queries
             WHERE user_id = :user_id 
-            AND book_id = :book_id;
+            AND book_id = :book_id
+            AND (CAST(:type_query AS varchar) IS NULL OR type_query = :type_query)
+            ORDER BY created_at, id
+            LIMIT 1;
         """)
 
-    result = await session.execute(query, {"user_id": user_id,
-                                           "book_id": book_id})
+
+async def get_book_query_by_user_book_id(session: AsyncSession, user_id: int, book_id: int,
+                                         type_query: str | None = None) -> BookQueryDBModel:
+    result = await session.execute(BOOK_QUERY_BY_USER_BOOK_ID, {"user_id": user_id,
+                                                                "book_id": book_id,
+                                                                "type_query": type_query})
 
     if not (result := result.one_or_none()):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Book query not found")
     
     book_query = result
-    await session.commit()
-    return BookQueryDBModel.from_orm(book_query)
+    return BOOK_QUERY_ROWS(book_query)
 
 
 async def create_book_query(session: AsyncSession, book_query_schema: BookQueryModel) -> BookQueryModel:
@@ -56,14 +69,275 @@ async def create_book_query(session: AsyncSession, book_query_schema: BookQueryM
     return book_query_schema
 
 
-async def delete_book_query_by_id(session: AsyncSession, book_query_id: int) -> BookQueryDBModel:
-    query = text("""
+RESERVE_BOOK = text("""
+                     WITH reserved_user AS (
+                         UPDATE users
+                         SET reserved_book_id = :book_id
+                         WHERE id = :user_id
+                         AND reserved_book_id IS NULL
+                         RETURNING id
+                     ), reserved_book AS (
+                         UPDATE books
+                         SET user_reserved_id = :user_id, date_start_reserve = now()
+                         WHERE id = :book_id
+                         AND user_reserved_id IS NULL
+                         AND user_id_taken IS NULL
+                         AND EXISTS (SELECT 1 FROM reserved_user)
+                         RETURNING id
+                     )
+                     INSERT INTO book_queries (user_id, book_id, type_order, type_query)
+                     SELECT :user_id, id, 'Add', 'Reserve'
+                     FROM reserved_book
+                     RETURNING *;
+                """)
+
+
+async def reserve_book(session: AsyncSession, user_id: int, book_id: int) -> BookQueryDBModel:
+    result = await session.execute(RESERVE_BOOK, {"user_id": user_id, "book_id": book_id})
+
+    if not (result := result.one_or_none()):
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="User has reserved a book or book had been reserved")
+
+    book_query = result
+    await session.commit()
+    await cache.delete(book_key(book_id), user_key(user_id))
+    return BOOK_QUERY_ROWS(book_query)
+
+
+CANCEL_RESERVE_BOOK = text("""
+                     WITH released_user AS (
+                         UPDATE users
+                         SET reserved_book_id = NULL
+                         WHERE id = :user_id
+                         AND email = :email
+                         AND reserved_book_id = :book_id
+                         RETURNING id
+                     ), released_book AS (
+                         UPDATE books
+                         SET user_reserved_id = NULL, date_start_reserve = NULL
+                         WHERE id = :book_id
+                         AND user_reserved_id = :user_id
+                         AND EXISTS (SELECT 1 FROM released_user)
+                         RETURNING id
+                     ), deleted_queries AS (
+                         DELETE FROM book_queries
+                         WHERE user_id = :user_id
+                         AND book_id IN (SELECT id FROM released_book)
+                         AND type_query = 'Reserve'
+                     )
+                     SELECT id
+                     FROM released_book;
+                """)
+
+
+async def cancel_reserve_book(session: AsyncSession, user_id: int, book_id: int, email: str) -> BookQueryModel:
+    result = await session.execute(CANCEL_RESERVE_BOOK, {"user_id": user_id, "book_id": book_id, "email": email})
+
+    if not result.one_or_none():
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="User hasn't reserved this book")
+
+    await session.commit()
+    await cache.delete(book_key(book_id), user_key(user_id))
+    return BookQueryModel(user_id=user_id, book_id=book_id, type_order="Cancel", type_query="Reserve")
+
+
+CREATE_TAKE_QUERY = text("""
+                     INSERT INTO book_queries (user_id, book_id, type_order, type_query)
+                     SELECT users.id, books.id, 'Add', 'Take'
+                     FROM users, books
+                     WHERE users.id = :user_id
+                     AND users.book_id_taken IS NULL
+                     AND books.id = :book_id
+                     AND books.user_id_taken IS NULL
+                     AND (books.user_reserved_id IS NULL OR books.user_reserved_id = users.id)
+                     ON CONFLICT ON CONSTRAINT uq_book_queries_user_book_type DO NOTHING
+                     RETURNING *;
+                """)
+
+
+async def create_take_query(session: AsyncSession, user_id: int, book_id: int) -> BookQueryDBModel:
+    result = await session.execute(CREATE_TAKE_QUERY, {"user_id": user_id, "book_id": book_id})
+
+    if not (result := result.one_or_none()):
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="User has taken a book or book had been taken")
+
+    book_query = result
+    await session.commit()
+    return BOOK_QUERY_ROWS(book_query)
+
+
+CREATE_CANCEL_TAKE_QUERY = text("""
+                     INSERT INTO book_queries (user_id, book_id, type_order, type_query)
+                     SELECT users.id, books.id, 'Cancel', 'Take'
+                     FROM users
+                     JOIN books ON books.id = users.book_id_taken AND books.user_id_taken = users.id
+                     WHERE users.id = :user_id
+                     AND books.id = :book_id
+                     ON CONFLICT ON CONSTRAINT uq_book_queries_user_book_type DO NOTHING
+                     RETURNING *;
+                """)
+
+
+async def create_cancel_take_query(session: AsyncSession, user_id: int, book_id: int) -> BookQueryDBModel:
+    result = await session.execute(CREATE_CANCEL_TAKE_QUERY, {"user_id": user_id, "book_id": book_id})
+
+    if not (result := result.one_or_none()):
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Book hadn't taken by user.")
+
+    book_query = result
+    await session.commit()
+    return BOOK_QUERY_ROWS(book_query)
+
+
+LOCK_BATCH = text("""
+                     WITH locked_queries AS (
+                         SELECT id
+                         FROM book_queries
+                         WHERE id = ANY(:ids)
+                         ORDER BY id
+                         FOR UPDATE
+                     ), locked_books AS (
+                         SELECT id
+                         FROM books
+                         WHERE id IN (SELECT book_id FROM book_queries WHERE id = ANY(:ids))
+                         ORDER BY id
+                         FOR UPDATE
+                     ), locked_users AS (
+                         SELECT id
+                         FROM users
+                         WHERE id IN (SELECT user_id FROM book_queries WHERE id = ANY(:ids))
+                         ORDER BY id
+                         FOR UPDATE
+                     )
+                     SELECT (SELECT count(*) FROM locked_queries),
+                            (SELECT count(*) FROM locked_books),
+                            (SELECT count(*) FROM locked_users);
+                """)
+
+ACCEPT_CANCEL_TAKE_BATCH = text("""
+                     WITH returned AS (
+                         SELECT DISTINCT ON (q.user_id) q.id, q.user_id, q.book_id
+                         FROM book_queries q
+                         JOIN books b ON b.id = q.book_id AND b.user_id_taken = q.user_id
+                         JOIN users u ON u.id = q.user_id AND u.book_id_taken = q.book_id
+                         WHERE q.id = ANY(:ids)
+                         AND q.type_order = 'Cancel'
+                         AND q.type_query = 'Take'
+                         ORDER BY q.user_id, q.id
+                     ), returned_books AS (
+                         UPDATE books b
+                         SET user_id_taken = NULL, date_start_use = NULL, date_finish_use = NULL
+                         FROM returned r
+                         WHERE b.id = r.book_id
+                     ), returned_users AS (
+                         UPDATE users u
+                         SET book_id_taken = NULL
+                         FROM returned r
+                         WHERE u.id = r.user_id
+                     )
+                     DELETE FROM book_queries q
+                     USING returned r
+                     WHERE q.id = r.id
+                     RETURNING q.*;
+                """)
+
+ACCEPT_RESERVE_BATCH = text("""
+                     DELETE FROM book_queries q
+                     USING books b
+                     WHERE q.id = ANY(:ids)
+                     AND q.type_query = 'Reserve'
+                     AND b.id = q.book_id
+                     AND b.user_reserved_id = q.user_id
+                     RETURNING q.*;
+                """)
+
+ACCEPT_TAKE_BATCH = text("""
+                     WITH per_user AS (
+                         SELECT DISTINCT ON (q.user_id) q.id, q.user_id, q.book_id
+                         FROM book_queries q
+                         JOIN books b ON b.id = q.book_id
+                         JOIN users u ON u.id = q.user_id
+                         WHERE q.id = ANY(:ids)
+                         AND q.type_order = 'Add'
+                         AND q.type_query = 'Take'
+                         AND b.user_id_taken IS NULL
+                         AND (b.user_reserved_id IS NULL OR b.user_reserved_id = q.user_id)
+                         AND u.book_id_taken IS NULL
+                         ORDER BY q.user_id, q.id
+                     ), issued AS (
+                         SELECT DISTINCT ON (book_id) id, user_id, book_id
+                         FROM per_user
+                         ORDER BY book_id, id
+                     ), issued_books AS (
+                         UPDATE books b
+                         SET user_id_taken = i.user_id, user_reserved_id = NULL, date_start_reserve = NULL,
+                             date_start_use = now(), date_finish_use = :date_finish
+                         FROM issued i
+                         WHERE b.id = i.book_id
+                     ), issued_users AS (
+                         UPDATE users u
+                         SET book_id_taken = i.book_id,
+                             reserved_book_id = NULLIF(u.reserved_book_id, i.book_id)
+                         FROM issued i
+                         WHERE u.id = i.user_id
+                     ), fulfilled_reserves AS (
+                         DELETE FROM book_queries q
+                         USING issued i
+                         WHERE q.user_id = i.user_id
+                         AND q.book_id = i.book_id
+                         AND q.type_query = 'Reserve'
+                     )
+                     DELETE FROM book_queries q
+                     USING issued i
+                     WHERE q.id = i.id
+                     RETURNING q.*;
+                """)
+
+REMAINING_BATCH = text("""
+                     SELECT id
+                     FROM book_queries
+                     WHERE id = ANY(:ids);
+                """)
+
+
+async def accept_book_queries(session: AsyncSession, query_ids: list[int],
+                              date_finish: datetime) -> tuple[list[BookQueryDBModel], set[int]]:
+    params = {"ids": query_ids}
+    await session.execute(LOCK_BATCH, params)
+
+    accepted = []
+    for query, query_params in ((ACCEPT_CANCEL_TAKE_BATCH, params),
+                                (ACCEPT_RESERVE_BATCH, params),
+                                (ACCEPT_TAKE_BATCH, {**params, "date_finish": date_finish})):
+        result = await session.execute(query, query_params)
+        accepted.extend(BOOK_QUERY_ROWS.all(result.all()))
+
+    result = await session.execute(REMAINING_BATCH, params)
+    remaining = set(result.scalars().all())
+    await session.commit()
+
+    await cache.delete(*(key for book_query in accepted if book_query.type_query == "Take"
+                         for key in (book_key(book_query.book_id), user_key(book_query.user_id))))
+    return accepted, remaining
+
+
+DELETE_BOOK_QUERY_BY_ID = text("""
                      DELETE FROM book_queries
                      WHERE id = :id
                      RETURNING *;
                 """)
 
-    result = await session.execute(query, {"id": book_query_id})
+
+async def delete_book_query_by_id(session: AsyncSession, book_query_id: int) -> BookQueryDBModel:
+    result = await session.execute(DELETE_BOOK_QUERY_BY_ID, {"id": book_query_id})
 
     if not (result := result.one_or_none()):
         raise HTTPException(
@@ -71,12 +345,189 @@ async def delete_book_query_by_id(session: AsyncSession, book_query_id: int) ->
     
     book_query = result
     await session.commit()
-    return BookQueryDBModel.from_orm(book_query)
+    return BOOK_QUERY_ROWS(book_query)
+
+
+BOOK_QUERIES_SORTABLE = {"id": BookQuery.id, "user_id": BookQuery.user_id, "book_id": BookQuery.book_id}
+
+
+async def get_book_queries(session: AsyncSession, sort_by: str = "id", cursor: str | None = None,
+                           limit: int = 20) -> BookQueryPage:
+    result = await session.execute(keyset_select(BookQuery, BOOK_QUERIES_SORTABLE, sort_by, cursor, limit))
+
+    book_queries, next_cursor = keyset_page(result.all(), sort_by, limit)
+    return BookQueryPage.construct(items=BOOK_QUERY_ROWS.all(book_queries), next_cursor=next_cursor)
+
+
+async def get_book_queries_after(session: AsyncSession, created_at: datetime, last_id: int = 0,
+                                 limit: int = 500) -> list[BookQueryDBModel]:
+    result = await session.execute(
+        select(BookQuery.__table__)
+        .where(tuple_(BookQuery.created_at, BookQuery.id) > tuple_(created_at, last_id))
+        .order_by(BookQuery.created_at, BookQuery.id)
+        .limit(limit))
+
+    return BOOK_QUERY_ROWS.all(result.all())
+
+
+async def get_existing_book_query_ids(session: AsyncSession, ids: list[int]) -> set[int]:
+    if not ids:
+        return set()
+    result = await session.execute(select(BookQuery.id).where(BookQuery.id.in_(ids)))
+
+    return set(result.scalars().all())
+
+
+# Each book keeps a tail sequence and a count of live holds in hold_queues. Enqueue takes the next
+# tail sequence under the counter row's lock and is always last, so its position is the live count.
+ENQUEUE_HOLD = text("""
+                     WITH queue AS (
+                         INSERT INTO hold_queues (book_id, tail_seq, hold_count)
+                         SELECT id, 1, 1
+                         FROM books
+                         WHERE id = :book_id
+                         ON CONFLICT (book_id) DO UPDATE
+                         SET tail_seq = hold_queues.tail_seq + 1, hold_count = hold_queues.hold_count + 1
+                         RETURNING tail_seq, hold_count
+                     ), inserted AS (
+                         INSERT INTO book_queries (user_id, book_id, type_order, type_query, hold_seq)
+                         SELECT :user_id, :book_id, 'Add', 'Hold', queue.tail_seq
+                         FROM queue
+                         ON CONFLICT ON CONSTRAINT uq_book_queries_user_book_type DO NOTHING
+                         RETURNING *
+                     )
+                     SELECT inserted.*, queue.hold_count AS position, queue.hold_count AS queue_length
+                     FROM inserted, queue;
+                """)
+
+
+async def enqueue_hold(session: AsyncSession, user_id: int, book_id: int) -> HoldPosition:
+    result = await session.execute(ENQUEUE_HOLD, {"user_id": user_id, "book_id": book_id})
+
+    if not (result := result.one_or_none()):
+        # Also undoes the counter increments, so a refused enqueue leaves no gap in the sequence.
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="User is already in the queue or book not found")
+
+    hold = result
+    await session.commit()
+    return HOLD_ROWS(hold)
+
+
+# Positions count the live holds up to this one, an index-only range scan on ix_book_queries_hold_seq,
+# so holds cancelled from the middle of the queue stop counting straight away.
+HOLD_POSITION = text("""
+                     SELECT hold.*,
+                            (SELECT count(*)
+                             FROM book_queries ahead
+                             WHERE ahead.book_id = hold.book_id
+                             AND ahead.type_query = 'Hold'
+                             AND ahead.hold_seq <= hold.hold_seq) AS position,
+                            queue.hold_count AS queue_length
+                     FROM book_queries hold
+                     JOIN hold_queues queue ON queue.book_id = hold.book_id
+                     WHERE hold.user_id = :user_id
+                     AND hold.book_id = :book_id
+                     AND hold.type_query = 'Hold';
+                """)
+
+
+async def get_hold_position(session: AsyncSession, user_id: int, book_id: int) -> HoldPosition:
+    result = await session.execute(HOLD_POSITION, {"user_id": user_id, "book_id": book_id})
+
+    if not (result := result.one_or_none()):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User isn't in the queue")
+
+    hold = result
+    return HOLD_ROWS(hold)
+
+
+CANCEL_HOLD = text("""
+                     WITH cancelled AS (
+                         DELETE FROM book_queries
+                         WHERE user_id = :user_id
+                         AND book_id = :book_id
+                         AND type_query = 'Hold'
+                         RETURNING *
+                     ), dequeued AS (
+                         UPDATE hold_queues queue
+                         SET hold_count = queue.hold_count - 1
+                         FROM cancelled gone
+                         WHERE queue.book_id = gone.book_id
+                     )
+                     SELECT *
+                     FROM cancelled;
+                """)
 
 
-async def get_book_queries(session: AsyncSession, offset_db: int | None = None, limit_db: int | None = None) -> List[BookQueryDBModel]:
-    result = await session.execute(select(BookQuery).offset(offset_db).limit(limit_db))
+async def cancel_hold(session: AsyncSession, user_id: int, book_id: int) -> BookQueryDBModel:
+    result = await session.execute(CANCEL_HOLD, {"user_id": user_id, "book_id": book_id})
 
-    result = result.all()
-    book_queries = [BookQueryDBModel.from_orm(row) for row in result]
-    return book_queries
+    if not (result := result.first()):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User isn't in the queue")
+
+    hold = result
+    await session.commit()
+    return BOOK_QUERY_ROWS(hold)
+
+
+POP_NEXT_HOLD = text("""
+                     WITH next_hold AS (
+                         SELECT q.id, q.user_id, q.book_id
+                         FROM book_queries q
+                         JOIN users u ON u.id = q.user_id AND u.reserved_book_id IS NULL
+                         WHERE q.book_id = :book_id
+                         AND q.type_query = 'Hold'
+                         ORDER BY q.hold_seq
+                         LIMIT 1
+                         FOR UPDATE OF q SKIP LOCKED
+                     ), reserved_user AS (
+                         UPDATE users u
+                         SET reserved_book_id = h.book_id
+                         FROM next_hold h
+                         WHERE u.id = h.user_id
+                         AND u.reserved_book_id IS NULL
+                         RETURNING u.id
+                     ), reserved_book AS (
+                         UPDATE books b
+                         SET user_reserved_id = h.user_id, date_start_reserve = now()
+                         FROM next_hold h
+                         WHERE b.id = h.book_id
+                         AND b.user_reserved_id IS NULL
+                         AND b.user_id_taken IS NULL
+                         AND EXISTS (SELECT 1 FROM reserved_user)
+                         RETURNING b.id
+                     ), served AS (
+                         DELETE FROM book_queries q
+                         USING next_hold h
+                         WHERE q.id = h.id
+                         AND EXISTS (SELECT 1 FROM reserved_book)
+                         RETURNING q.id, q.book_id, q.hold_seq
+                     ), dequeued AS (
+                         UPDATE hold_queues queue
+                         SET hold_count = queue.hold_count - 1
+                         FROM served gone
+                         WHERE queue.book_id = gone.book_id
+                     )
+                     INSERT INTO book_queries (user_id, book_id, type_order, type_query)
+                     SELECT h.user_id, h.book_id, 'Add', 'Reserve'
+                     FROM next_hold h, reserved_book
+                     RETURNING *;
+                """)
+
+
+async def pop_next_hold(session: AsyncSession, book_id: int) -> BookQueryDBModel:
+    result = await session.execute(POP_NEXT_HOLD, {"book_id": book_id})
+
+    if not (result := result.one_or_none()):
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Book isn't available or queue is empty")
+
+    book_query = result
+    await session.commit()
+    await cache.delete(book_key(book_query.book_id), user_key(book_query.user_id))
+    return BOOK_QUERY_ROWS(book_query)
@@ -1,4 +1,7 @@
-from sqlalchemy import text, select
+from typing import AsyncIterator
+from datetime import datetime
+from asyncpg.transaction import Transaction
+from sqlalchemy import text, select, update
 from fastapi import status
 
 from fastapi.exceptions import HTTPException
@@ -7,22 +10,68 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.books import Books
 
-from app.schemas.books import BookDBModel, BookModel
+from app.schemas.books import BookDBModel, BookModel, BookPage, OverdueLoanModel
+from app.schemas.mapper import RowMapper
 
+from app.core.cache import cache, book_key, user_key
+from app.core.db_conn import reads_replica
 
-async def search_book_by_title(session: AsyncSession, book_title: str) -> BookDBModel:
-    query = text("""
+from app.methods.pagination import encode_cursor, decode_cursor, keyset_select, keyset_page
+
+
+BOOK_ROWS = RowMapper(BookDBModel)
+OVERDUE_LOAN_ROWS = RowMapper(OverdueLoanModel)
+
+SEARCH_DOCUMENT = "to_tsvector('simple', name || ' ' || authors)"
+
+SEARCH_MATCHES = f"""
+                     WITH matches AS (
+                         SELECT books.*,
+                                ts_rank_cd({SEARCH_DOCUMENT}, websearch_to_tsquery('simple', :query))
+                                + word_similarity(:query, name)
+                                + word_similarity(:query, authors) AS rank
+                         FROM books
+                         WHERE {SEARCH_DOCUMENT} @@ websearch_to_tsquery('simple', :query)
+                         OR :query <% name
+                         OR :query <% authors
+                     )
                      SELECT *
-                     FROM books
-                     WHERE title LIKE :new_title
-                     LIMIT 10;
+                     FROM matches
+"""
+
+SEARCH_FIRST_PAGE = text(SEARCH_MATCHES + """
+                     ORDER BY rank DESC, id DESC
+                     LIMIT :limit;
+                """)
+
+SEARCH_NEXT_PAGE = text(SEARCH_MATCHES + """
+                     WHERE (rank, id) < (CAST(:rank AS real), :id)
+                     ORDER BY rank DESC, id DESC
+                     LIMIT :limit;
                 """)
 
-    result = await session.execute(query, {"new_title": "%" + book_title + "%"})
 
-    result = result.all()
-    books = [BookDBModel.from_orm(row) for row in result]
-    return books
+async def search_book_by_title(session: AsyncSession, book_title: str,
+                               cursor: str | None = None, limit: int = 10) -> BookPage:
+    params = {"query": book_title, "limit": limit + 1}
+    if cursor is None:
+        result = await session.execute(SEARCH_FIRST_PAGE, params)
+    else:
+        position = decode_cursor(cursor)
+        try:
+            params.update(rank=float(position["rank"]), id=int(position["id"]))
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor is uncorrect")
+        result = await session.execute(SEARCH_NEXT_PAGE, params)
+
+    rows = result.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({"rank": rows[-1].rank, "id": rows[-1].id})
+
+    return BookPage.construct(items=BOOK_ROWS.all(rows), next_cursor=next_cursor)
 
 
 async def create_book(session: AsyncSession, book_schema: BookModel) -> BookModel:
@@ -34,32 +83,38 @@ async def create_book(session: AsyncSession, book_schema: BookModel) -> BookMode
     return BookModel.from_orm(book_schema)
 
 
-async def get_book_by_id(session: AsyncSession, book_id: int) -> BookDBModel:
-    query = text("""
+BOOK_BY_ID = text("""
             SELECT *
             FROM books
             WHERE id = :id;
         """)
 
-    result = await session.execute(query, {"id": book_id})
+
+async def get_book_by_id(session: AsyncSession, book_id: int) -> BookDBModel:
+    if (cached := await cache.get(book_key(book_id))) is not None:
+        return cache.restore(BookDBModel, cached)
+
+    result = await session.execute(BOOK_BY_ID, {"id": book_id})
 
     if not (result := result.one_or_none()):    
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
     
-    book = result
-    await session.commit()
-    return BookDBModel.from_orm(book)
+    book = BOOK_ROWS(result)
+    if not reads_replica(session):
+        await cache.set(book_key(book_id), book.dict())
+    return book
 
 
-async def delete_book_by_id(session: AsyncSession, book_id: int) -> BookDBModel:
-    query = text("""
+DELETE_BOOK_BY_ID = text("""
                      DELETE FROM books
                      WHERE id = :id
                      RETURNING *;
                 """)
 
-    result = await session.execute(query, {"id": book_id})
+
+async def delete_book_by_id(session: AsyncSession, book_id: int) -> BookDBModel:
+    result = await session.execute(DELETE_BOOK_BY_ID, {"id": book_id})
 
     if not (result := result.one_or_none()):
         raise HTTPException(
@@ -67,11 +122,11 @@ async def delete_book_by_id(session: AsyncSession, book_id: int) -> BookDBModel:
     
     book = result
     await session.commit()
-    return BookDBModel.from_orm(book)
+    await cache.delete(book_key(book_id))
+    return BOOK_ROWS(book)
 
 
-async def update_book(session: AsyncSession, book_schema: BookDBModel) -> BookDBModel:
-    query = text("""
+UPDATE_BOOK = text("""
                          UPDATE books
                          SET (name, authors, user_id_taken, user_reserved_id, date_start_reserve, date_start_use, date_finish_use) = 
                          (:name, :authors, :user_id_taken, :user_reserved_id, :date_start_reserve, :date_start_use, :date_finish_use) 
@@ -79,7 +134,9 @@ async def update_book(session: AsyncSession, book_schema: BookDBModel) -> BookDB
                          RETURNING *;
             """)
 
-    result = await session.execute(query, book_schema.dict())
+
+async def update_book(session: AsyncSession, book_schema: BookDBModel) -> BookDBModel:
+    result = await session.execute(UPDATE_BOOK, book_schema.dict())
 
     if not (result := result.one_or_none()):
         raise HTTPException(
@@ -87,12 +144,203 @@ async def update_book(session: AsyncSession, book_schema: BookDBModel) -> BookDB
     
     book = result
     await session.commit()
-    return BookDBModel.from_orm(book)
+    await cache.delete(book_key(book_schema.id))
+    return BOOK_ROWS(book)
+
+
+async def patch_book(session: AsyncSession, book_id: int, changes: dict) -> BookDBModel:
+    if not changes:
+        return await get_book_by_id(session, book_id)
+
+    result = await session.execute(
+        update(Books.__table__).where(Books.id == book_id).values(**changes).returning(Books.__table__))
+
+    if not (result := result.one_or_none()):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+
+    book = result
+    await session.commit()
+    await cache.delete(book_key(book_id))
+    return BOOK_ROWS(book)
+
+
+BOOKS_SORTABLE = {"id": Books.id, "name": Books.name, "authors": Books.authors}
+
+
+async def get_books(session: AsyncSession, sort_by: str = "id", cursor: str | None = None,
+                    limit: int = 20) -> BookPage:
+    result = await session.execute(keyset_select(Books, BOOKS_SORTABLE, sort_by, cursor, limit))
+
+    books, next_cursor = keyset_page(result.all(), sort_by, limit)
+    return BookPage.construct(items=BOOK_ROWS.all(books), next_cursor=next_cursor)
+
 
+async def stream_books(session: AsyncSession, chunk_size: int = 1000) -> AsyncIterator[list[dict]]:
+    result = await session.stream(
+        select(Books.__table__).order_by(Books.id).execution_options(yield_per=chunk_size))
+
+    async for rows in result.mappings().partitions():
+        yield [dict(row) for row in rows]
+
+
+BOOK_COPY_COLUMNS = ("name", "authors", "user_id_taken", "user_reserved_id",
+                     "date_start_reserve", "date_start_use", "date_finish_use")
+
+
+async def _driver_connection(session: AsyncSession):
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    return raw_connection.driver_connection
+
+
+async def begin_copy(session: AsyncSession) -> Transaction:
+    # The asyncpg adapter only sends BEGIN before its first cursor execute, so without an
+    # explicit transaction every COPY on the driver connection commits on its own.
+    transaction = (await _driver_connection(session)).transaction()
+    await transaction.start()
+    return transaction
+
+
+async def copy_books(session: AsyncSession, records: list[tuple]) -> int:
+    await (await _driver_connection(session)).copy_records_to_table(
+        Books.__tablename__, records=records, columns=BOOK_COPY_COLUMNS)
+    return len(records)
+
+
+OVERDUE_LOANS_CHANNEL = "overdue_loans"
+
+
+OVERDUE_CHECKPOINT_LOCK = text("SELECT pg_try_advisory_xact_lock(hashtext(:name));")
+
+# The checkpoint only moves forward along (date_finish_use, id). A loan whose due date is edited to,
+# or committed with, a value behind the checkpoint is never picked up by the sweep.
+RECORD_OVERDUE_LOANS = text("""
+                     WITH checkpoint AS (
+                         SELECT COALESCE(max(position_at), '-infinity') AS position_at,
+                                COALESCE(max(position_id), 0) AS position_id
+                         FROM worker_checkpoints
+                         WHERE name = :name
+                     ), batch AS (
+                         SELECT books.id, books.user_id_taken, books.date_finish_use
+                         FROM books, checkpoint
+                         WHERE books.user_id_taken IS NOT NULL
+                         AND books.date_finish_use < now()
+                         AND (books.date_finish_use, books.id) > (checkpoint.position_at, checkpoint.position_id)
+                         ORDER BY books.date_finish_use, books.id
+                         LIMIT :batch_size
+                     ), recorded AS (
+                         INSERT INTO overdue_loans (book_id, user_id, date_finish_use)
+                         SELECT id, user_id_taken, date_finish_use
+                         FROM batch
+                         ON CONFLICT ON CONSTRAINT uq_overdue_loans_loan DO NOTHING
+                         RETURNING id, book_id, user_id, date_finish_use
+                     ), notified AS (
+                         SELECT pg_notify(:channel, json_build_object(
+                             'id', id, 'book_id', book_id, 'user_id', user_id,
+                             'date_finish_use', date_finish_use)::text)
+                         FROM recorded
+                     ), last_loan AS (
+                         SELECT date_finish_use, id
+                         FROM batch
+                         ORDER BY date_finish_use DESC, id DESC
+                         LIMIT 1
+                     )
+                     INSERT INTO worker_checkpoints (name, position_at, position_id, updated_at)
+                     SELECT :name, date_finish_use, id, now()
+                     FROM last_loan
+                     ON CONFLICT (name) DO UPDATE
+                     SET position_at = EXCLUDED.position_at,
+                         position_id = EXCLUDED.position_id,
+                         updated_at = EXCLUDED.updated_at
+                     RETURNING (SELECT count(*) FROM batch) AS found, (SELECT count(*) FROM notified) AS notified;
+                """)
+
+
+async def record_overdue_loans(session: AsyncSession, checkpoint: str, batch_size: int) -> int | None:
+    result = await session.execute(OVERDUE_CHECKPOINT_LOCK, {"name": checkpoint})
+    if not result.scalar():
+        await session.rollback()
+        return None
+
+    # The loans land in the overdue_loans outbox in the same statement that moves the checkpoint,
+    # so nothing is lost when no one is listening; the NOTIFY only wakes up live consumers.
+    result = await session.execute(RECORD_OVERDUE_LOANS, {"name": checkpoint, "batch_size": batch_size,
+                                                          "channel": OVERDUE_LOANS_CHANNEL})
+    found = result.scalar() or 0
+    await session.commit()
+    return found
+
+
+OVERDUE_LOANS_AFTER = text("""
+                     SELECT id, book_id, user_id, date_finish_use, recorded_at
+                     FROM overdue_loans
+                     WHERE id > :after_id
+                     ORDER BY id
+                     LIMIT :limit;
+                """)
+
+
+async def get_overdue_loans_after(session: AsyncSession, after_id: int, limit: int = 100) -> list[OverdueLoanModel]:
+    result = await session.execute(OVERDUE_LOANS_AFTER, {"after_id": after_id, "limit": limit})
+
+    return OVERDUE_LOAN_ROWS.all(result.all())
+
+
+NEXT_RESERVATION_START = text("""
+                     SELECT date_start_reserve
+                     FROM books
+                     WHERE user_reserved_id IS NOT NULL
+                     AND date_start_reserve IS NOT NULL
+                     ORDER BY date_start_reserve
+                     LIMIT 1;
+                """)
+
+
+async def get_next_reservation_start(session: AsyncSession) -> datetime | None:
+    result = await session.execute(NEXT_RESERVATION_START)
+    return result.scalar()
+
+
+RELEASE_EXPIRED_RESERVATIONS = text("""
+                     WITH expired AS (
+                         SELECT id, user_reserved_id
+                         FROM books
+                         WHERE user_reserved_id IS NOT NULL
+                         AND date_start_reserve <= :deadline
+                         ORDER BY date_start_reserve, id
+                         LIMIT :batch_size
+                         FOR UPDATE SKIP LOCKED
+                     ), released_books AS (
+                         UPDATE books b
+                         SET user_reserved_id = NULL, date_start_reserve = NULL
+                         FROM expired e
+                         WHERE b.id = e.id
+                         RETURNING b.id, e.user_reserved_id AS user_id
+                     ), released_users AS (
+                         UPDATE users u
+                         SET reserved_book_id = NULL
+                         FROM released_books r
+                         WHERE u.id = r.user_id
+                         AND u.reserved_book_id = r.id
+                     ), stale_queries AS (
+                         DELETE FROM book_queries q
+                         USING released_books r
+                         WHERE q.book_id = r.id
+                         AND q.user_id = r.user_id
+                         AND q.type_query = 'Reserve'
+                     )
+                     SELECT id, user_id
+                     FROM released_books;
+                """)
+
+
+async def release_expired_reservations(session: AsyncSession, deadline: datetime,
+                                       batch_size: int = 500) -> list[tuple[int, int]]:
+    result = await session.execute(RELEASE_EXPIRED_RESERVATIONS, {"deadline": deadline, "batch_size": batch_size})
+    released = [(row.id, row.user_id) for row in result.all()]
+    await session.commit()
 
-async def get_books(session: AsyncSession, offset_db: int | None = None, limit_db: int | None = None) -> BookDBModel:
-    result = session.execute(
-        select(Books).offset(offset_db).limit(limit_db))
-    result = result.all()
-    users = [BookDBModel.from_orm(row) for row in result]
-    return users
+    await cache.delete(*(key for book_id, user_id in released
+                         for key in (book_key(book_id), user_key(user_id))))
+    return released
@@ -0,0 +1,40 @@
+from datetime import datetime
+from sqlalchemy import text
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+INSERT_REVOKED_TOKEN = text("""
+                     INSERT INTO revoked_tokens (jti, expires_at)
+                     VALUES (:jti, :expires_at)
+                     ON CONFLICT (jti) DO NOTHING;
+                """)
+
+
+async def revoke_token(session: AsyncSession, jti: str, expires_at: datetime):
+    await session.execute(INSERT_REVOKED_TOKEN, {"jti": jti, "expires_at": expires_at})
+    await session.commit()
+
+
+ACTIVE_REVOKED_TOKENS = text("""
+                     SELECT jti, expires_at
+                     FROM revoked_tokens
+                     WHERE expires_at > now();
+                """)
+
+
+async def get_active_revoked_tokens(session: AsyncSession) -> dict[str, datetime]:
+    result = await session.execute(ACTIVE_REVOKED_TOKENS)
+    return dict(result.tuples().all())
+
+
+DELETE_EXPIRED_REVOKED_TOKENS = text("""
+                     DELETE FROM revoked_tokens
+                     WHERE expires_at <= now();
+                """)
+
+
+async def delete_expired_revoked_tokens(session: AsyncSession) -> int:
+    result = await session.execute(DELETE_EXPIRED_REVOKED_TOKENS)
+    await session.commit()
+    return result.rowcount
@@ -1,32 +1,41 @@
-from typing import List
-from sqlalchemy import text, select
+from sqlalchemy import text, update
 from pydantic import EmailStr
 from fastapi import HTTPException, status
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.users import UserDBModel, UserHashedModel
+from app.schemas.users import UserDBModel, UserHashedModel, UserPublicModel, UserPage
+from app.schemas.mapper import RowMapper
 from app.schemas.tokens import AuthModel
 
 from app.models.users import Users
 
+from app.core.cache import cache, user_key
+from app.core.db_conn import reads_replica
 
-async def get_user_by_email(session: AsyncSession, email: EmailStr) -> UserDBModel:
-    query = text("""
+from app.methods.pagination import keyset_select, keyset_page
+
+
+USER_ROWS = RowMapper(UserDBModel)
+USER_HASHED_ROWS = RowMapper(UserHashedModel)
+USER_PUBLIC_ROWS = RowMapper(UserPublicModel)
+
+USER_BY_EMAIL = text("""
                      SELECT *
                      FROM users
                      WHERE email = :user_email;
                 """)
 
-    result = await session.execute(query, {"user_email": email})
+
+async def get_user_by_email(session: AsyncSession, email: EmailStr) -> UserDBModel:
+    result = await session.execute(USER_BY_EMAIL, {"user_email": email})
 
     if not (result := result.one_or_none()):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
     user = result
-    await session.commit()
-    return UserDBModel.from_orm(user)
+    return USER_ROWS(user)
 
 
 async def create_user(session: AsyncSession, user_schema: UserHashedModel) -> UserHashedModel:
@@ -38,24 +47,29 @@ async def create_user(session: AsyncSession, user_schema: UserHashedModel) -> Us
     return user_schema
 
 
-async def get_user_by_id(session: AsyncSession, id: int) -> UserDBModel:
-    query = text("""
+USER_BY_ID = text("""
                      SELECT *
                      FROM users
                      WHERE id = :user_id;                    
                 """)
-    result = await session.execute(query, {"user_id": id})
+
+
+async def get_user_by_id(session: AsyncSession, id: int) -> UserDBModel:
+    if (cached := await cache.get(user_key(id))) is not None:
+        return cache.restore(UserDBModel, cached)
+
+    result = await session.execute(USER_BY_ID, {"user_id": id})
 
     if not (result := result.one_or_none()):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    user = result
-    await session.commit()
-    return UserDBModel.from_orm(user)
+    user = USER_ROWS(result)
+    if not reads_replica(session):
+        await cache.set(user_key(id), user.dict())
+    return user
 
 
-async def update_user(session: AsyncSession, user: UserDBModel) -> UserHashedModel:
-    query = text("""
+UPDATE_USER = text("""
                      UPDATE users
                      SET (name, surname, last_name, email, user_type, book_id_taken, reserved_book_id, access_token, time_token_create, hashed_password) = 
                      (:name, :surname, :last_name, :email, :user_type, :book_id_taken, :reserved_book_id, :access_token, :time_token_create, :hashed_password)
@@ -63,25 +77,46 @@ async def update_user(session: AsyncSession, user: UserDBModel) -> UserHashedMod
                      RETURNING name, surname, last_name, email, user_type, book_id_taken, reserved_book_id, access_token, time_token_create, hashed_password;
             """)
 
-    result = await session.execute(query, user.dict())
+
+async def update_user(session: AsyncSession, user: UserDBModel) -> UserHashedModel:
+    result = await session.execute(UPDATE_USER, user.dict())
 
     if not (result := result.one_or_none()):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
+    updated_user = result
+    await session.commit()
+    await cache.delete(user_key(user.id))
+    return USER_HASHED_ROWS(updated_user)
+
+
+async def patch_user(session: AsyncSession, user_id: int, changes: dict) -> UserDBModel:
+    if not changes:
+        return await get_user_by_id(session, user_id)
+
+    result = await session.execute(
+        update(Users.__table__).where(Users.id == user_id).values(**changes).returning(Users.__table__))
+
+    if not (result := result.one_or_none()):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
     user = result
     await session.commit()
-    return UserHashedModel.from_orm(user)
+    await cache.delete(user_key(user_id))
+    return USER_ROWS(user)
 
 
-async def delete_user_by_id(session: AsyncSession, id: int) -> UserHashedModel:
-    query = text("""
+DELETE_USER_BY_ID = text("""
                      DELETE FROM users
                      WHERE id = :id
                      RETURNING name, surname, last_name, email, user_type, book_id_taken, reserved_book_id, access_token, time_token_create, hashed_password;                           
                 """)
 
-    result = await session.execute(query, {"id": id})
+
+async def delete_user_by_id(session: AsyncSession, id: int) -> UserHashedModel:
+    result = await session.execute(DELETE_USER_BY_ID, {"id": id})
 
     if not (result := result.one_or_none()):
         raise HTTPException(
@@ -89,32 +124,38 @@ async def delete_user_by_id(session: AsyncSession, id: int) -> UserHashedModel:
     
     deleted_user = result
     await session.commit()
-    return UserHashedModel.from_orm(deleted_user)
+    await cache.delete(user_key(id))
+    return USER_HASHED_ROWS(deleted_user)
 
 
-async def get_user_by_email_password(session: AsyncSession, auth_schema: AuthModel) -> UserHashedModel:
-    query = text(
-        """
+USER_BY_EMAIL_PASSWORD = text("""
             SELECT *
             FROM users
             WHERE email = :user_email
             AND password = :user_password;
         """)
 
-    result = await session.execute(query, auth_schema.dict())
+
+async def get_user_by_email_password(session: AsyncSession, auth_schema: AuthModel) -> UserHashedModel:
+    result = await session.execute(USER_BY_EMAIL_PASSWORD, auth_schema.dict())
 
     if not (result := result.one_or_none()):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
     user = result
-    session.commit()
-    return UserHashedModel.from_orm(user)
+    return USER_HASHED_ROWS(user)
+
+
+USERS_SORTABLE = {"id": Users.id, "email": Users.email, "surname": Users.surname}
+# Credentials never leave the table through the public listing.
+USERS_PUBLIC_COLUMNS = tuple(getattr(Users, name) for name in UserPublicModel.__fields__)
 
 
-async def get_users(session: AsyncSession, db_offset: int | None = None, db_limit: int | None = None) -> List[UserHashedModel]:
-    result = await session.execute(select(Users).offset(db_offset).limit(db_limit))
+async def get_users(session: AsyncSession, sort_by: str = "id", cursor: str | None = None,
+                    limit: int = 20) -> UserPage:
+    result = await session.execute(
+        keyset_select(Users, USERS_SORTABLE, sort_by, cursor, limit, USERS_PUBLIC_COLUMNS))
 
-    result = result.all()
-    users = [UserHashedModel.from_orm(row) for row in result]
-    return users
+    users, next_cursor = keyset_page(result.all(), sort_by, limit)
+    return UserPage.construct(items=USER_PUBLIC_ROWS.all(users), next_cursor=next_cursor)
@@ -1,3 +1,4 @@
+import asyncio
 import uvicorn
 
 from fastapi import FastAPI
@@ -5,14 +6,28 @@ from fastapi import FastAPI
 
 from starlette.middleware.cors import CORSMiddleware
 
-from app.core.settings import Base
+from app.core.settings import (Base, DB_ENGINE, REPLICA_DB_ENGINES, EnvOverdueSettings, EnvReservationSettings,
+                               EnvSQLTraceSettings, EnvProfilingSettings, replica_settings)
 
-from app.core.db_conn import check_connection
+from app.core.db_conn import check_connection, ReadPinMiddleware
+from app.core.notify import listener
+from app.core.replicas import replicas
+from app.core.instrumentation import SQLTraceMiddleware, install_sql_trace
+from app.core.metrics import MetricsMiddleware, metrics_response, mark_process_dead
+from app.core.profiling import ProfilingMiddleware
+from app.core.slow_queries import slow_queries
+from app.core.security import hash_executor
+from app.core.revocation import revocations, REVOKED_TOKENS_CHANNEL
+
+from app.methods.query_feed import query_feed, BOOK_QUERIES_CHANNEL
+from app.methods.overdue import run_overdue_scanner
+from app.methods.reservations import ReservationSweeper
 
 from app.routes.api import api_router
 
 
 app = FastAPI()
+background_tasks: set[asyncio.Task] = set()
 
 
 origins = ["*"]
@@ -24,15 +39,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ReadPinMiddleware)
+
+if (sql_trace_settings := EnvSQLTraceSettings()).enabled:
+    install_sql_trace()
+    app.add_middleware(SQLTraceMiddleware, repeat_threshold=sql_trace_settings.repeat_threshold)
+
+if (profiling_settings := EnvProfilingSettings()).enabled:
+    app.add_middleware(ProfilingMiddleware, settings=profiling_settings)
+
 
 @app.on_event("startup")
 async def startup_event():
     await check_connection()
+    await revocations.load()
+    listener.subscribe(REVOKED_TOKENS_CHANNEL, revocations.on_revoked, on_subscribed=revocations.reload)
+    background_tasks.add(asyncio.create_task(revocations.run()))
+    listener.subscribe(BOOK_QUERIES_CHANNEL, query_feed.publish, on_subscribed=query_feed.disconnect_all)
+    if (reservation_settings := EnvReservationSettings()).enabled:
+        sweeper = ReservationSweeper(reservation_settings)
+        listener.subscribe(BOOK_QUERIES_CHANNEL, sweeper.on_book_query, on_subscribed=sweeper.reload)
+        background_tasks.add(asyncio.create_task(sweeper.run()))
+    await listener.start()
+
+    if (overdue_settings := EnvOverdueSettings()).enabled:
+        background_tasks.add(asyncio.create_task(run_overdue_scanner(overdue_settings)))
+
+    if slow_queries.settings.enabled:
+        slow_queries.install(DB_ENGINE, *REPLICA_DB_ENGINES)
+        background_tasks.add(asyncio.create_task(slow_queries.run()))
+
+    if replicas.engines:
+        background_tasks.add(asyncio.create_task(
+            replicas.run_health_checks(replica_settings.health_check_interval_seconds)))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await listener.stop()
+    hash_executor.shutdown(wait=False, cancel_futures=True)
+    mark_process_dead()
 
 
 app.include_router(api_router)
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
+
+
 @app.get("/")
 async def root():
     return {"message": "Hello world!"}
@@ -0,0 +1,202 @@
+import csv
+import json
+import codecs
+
+from collections import deque
+from typing import AsyncIterator, Literal
+
+from asyncpg import PostgresError
+from pydantic import ValidationError
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import books
+
+from app.schemas.books import BookModel, BookImportError, BookImportReport
+
+
+MAX_REPORTED_ERRORS = 1000
+
+
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+class _LineFeed:
+    # A csv.reader source that can be refilled after it runs dry.
+    def __init__(self):
+        self.lines: deque[str] = deque()
+        self.starved = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            self.starved = True
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def _iter_csv_records(stream: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, object]]:
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    header = None
+    row = 0
+    record_lines: list[str] = []
+
+    async for line in _iter_lines(stream):
+        if not record_lines and not line.strip():
+            continue
+        record_lines.append(line)
+        # The reader only asks for another line while a quoted field is still open. The partial row it
+        # returns then is dropped and the record is parsed again from its first line once more arrives.
+        feed.starved = False
+        feed.lines.extend(record_lines)
+        values = next(reader)
+        if feed.starved:
+            continue
+        record_lines.clear()
+
+        if header is None:
+            header = values
+            continue
+        row += 1
+        yield row, dict(zip(header, (value or None for value in values)))
+
+    if record_lines:
+        yield row + 1, ValueError("Unterminated quoted field")
+
+
+async def _iter_ndjson_records(stream: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, object]]:
+    row = 0
+
+    async for line in _iter_lines(stream):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, json.loads(line)
+        except ValueError as error:
+            yield row, error
+
+
+def _iter_records(stream: AsyncIterator[bytes],
+                  format: Literal["ndjson", "csv"]) -> AsyncIterator[tuple[int, object]]:
+    if format == "csv":
+        return _iter_csv_records(stream)
+    return _iter_ndjson_records(stream)
+
+
+def _error_detail(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, item['loc']))}: {item['msg']}" for item in error.errors())
+    return str(error)
+
+
+def _to_copy_record(record: object) -> tuple:
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Row must be an object")
+
+    book = BookModel.parse_obj(record)
+    values = book.dict(include=set(books.BOOK_COPY_COLUMNS))
+    return tuple(values[column] for column in books.BOOK_COPY_COLUMNS)
+
+
+async def import_books(session: AsyncSession, stream: AsyncIterator[bytes],
+                       format: Literal["ndjson", "csv"] = "ndjson", chunk_size: int = 1000,
+                       atomic: bool = True, skip_rows: int = 0) -> BookImportReport:
+    report = BookImportReport(last_committed_row=skip_rows)
+    stopped = False
+    batch = []
+    batch_first_row = batch_last_row = skip_rows
+    transaction = None
+
+    async def commit():
+        nonlocal transaction
+        if transaction is not None:
+            await transaction.commit()
+            transaction = None
+        await session.commit()
+
+    async def rollback():
+        nonlocal transaction
+        if transaction is not None:
+            await transaction.rollback()
+            transaction = None
+        await session.rollback()
+
+    async def flush() -> bool:
+        nonlocal transaction
+        if not batch:
+            return True
+        if transaction is None:
+            transaction = await books.begin_copy(session)
+        try:
+            report.rows_inserted += await books.copy_books(session, batch)
+        except PostgresError as error:
+            await rollback()
+            report.errors.append(BookImportError(
+                row=batch_first_row, detail=f"Rows {batch_first_row}-{batch_last_row}: {_error_detail(error)}"))
+            if atomic:
+                report.rows_inserted = 0
+            return False
+        batch.clear()
+        if not atomic:
+            await commit()
+            report.last_committed_row = batch_last_row
+        return True
+
+    try:
+        async for row, record in _iter_records(stream, format):
+            if row <= skip_rows:
+                continue
+            report.rows_read += 1
+
+            try:
+                copy_record = _to_copy_record(record)
+            except (ValidationError, ValueError, TypeError) as error:
+                report.errors.append(BookImportError(row=row, detail=_error_detail(error)))
+                if len(report.errors) >= MAX_REPORTED_ERRORS:
+                    stopped = True
+                    break
+                continue
+
+            if atomic and report.errors:
+                continue
+            if not batch:
+                batch_first_row = row
+            batch.append(copy_record)
+            batch_last_row = row
+            if len(batch) >= chunk_size and not await flush():
+                return report
+
+        if atomic and report.errors:
+            await rollback()
+            report.rows_inserted = 0
+            return report
+
+        if not await flush():
+            return report
+        if atomic:
+            await commit()
+            report.last_committed_row = batch_last_row
+        report.completed = not stopped
+        return report
+    finally:
+        # The session cannot roll back a transaction it never started, so don't hand it back open.
+        if transaction is not None:
+            await transaction.rollback()
@@ -0,0 +1,32 @@
+import io
+import csv
+import json
+
+from datetime import datetime
+from typing import AsyncIterator
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def rows_to_ndjson(chunks: AsyncIterator[list[dict]]) -> AsyncIterator[str]:
+    async for rows in chunks:
+        yield "".join(json.dumps(row, default=_plain, ensure_ascii=False) + "\n" for row in rows)
+
+
+async def rows_to_csv(chunks: AsyncIterator[list[dict]], columns: list[str]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(columns)
+    async for rows in chunks:
+        writer.writerows([_plain(row[column]) for column in columns] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
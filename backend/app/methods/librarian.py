@@ -9,7 +9,7 @@ from app.crud import users
 from app.crud import books
 from app.crud import book_query
 
-from app.schemas.book_query import BookQueryDBModel
+from app.schemas.book_query import BookQueryDBModel, BookQueryBatchResult
 
 
 async def accept_reserve_book(email: EmailStr, user_id: int, book_id: int, session: AsyncSession) -> BookQueryDBModel:
@@ -87,3 +87,24 @@ async def cancel_take_book(email: EmailStr, user_id: int, book_id: int, session:
         await books.create_book(session, book)
 
         return await book_query.delete_book_query_by_id(session, query.id)
+
+
+async def accept_queries_batch(query_ids: list[int], session: AsyncSession,
+                               date_finish: datetime | None = None) -> list[BookQueryBatchResult]:
+    query_ids = list(dict.fromkeys(query_ids))
+    date_finish = date_finish or datetime.now(timezone.utc) + timedelta(days=31)
+
+    accepted, remaining = await book_query.accept_book_queries(session, query_ids, date_finish)
+    accepted = {query.id: query for query in accepted}
+
+    results = []
+    for query_id in query_ids:
+        if query_id in accepted:
+            results.append(BookQueryBatchResult(query_id=query_id, success=True, query=accepted[query_id]))
+        elif query_id in remaining:
+            results.append(BookQueryBatchResult(query_id=query_id, success=False,
+                                                detail="Book query can't be accepted"))
+        else:
+            results.append(BookQueryBatchResult(query_id=query_id, success=False,
+                                                detail="Book query not found"))
+    return results
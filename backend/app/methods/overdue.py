@@ -0,0 +1,40 @@
+import asyncio
+import logging
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import BACKGROUND_DB_ENGINE, EnvOverdueSettings
+
+from app.crud import books
+
+
+logger = logging.getLogger(__name__)
+
+OVERDUE_CHECKPOINT = "overdue_loans"
+
+
+async def sweep_overdue_loans(settings: EnvOverdueSettings) -> int:
+    total = 0
+    async with AsyncSession(BACKGROUND_DB_ENGINE, expire_on_commit=False) as session:
+        while True:
+            found = await books.record_overdue_loans(session, OVERDUE_CHECKPOINT, settings.batch_size)
+            if found is None:
+                logger.debug("Overdue sweep is running in another worker")
+                break
+            total += found
+            if found < settings.batch_size:
+                break
+            await asyncio.sleep(settings.batch_pause_seconds)
+    return total
+
+
+async def run_overdue_scanner(settings: EnvOverdueSettings | None = None):
+    settings = settings or EnvOverdueSettings()
+    while True:
+        try:
+            if found := await sweep_overdue_loans(settings):
+                logger.info("Overdue sweep recorded %d loans", found)
+        except (SQLAlchemyError, OSError) as error:
+            logger.warning("Overdue sweep failed: %s", error)
+        await asyncio.sleep(settings.interval_seconds)
@@ -0,0 +1,62 @@
+import json
+import base64
+import binascii
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy import Select, select, tuple_
+
+
+def encode_cursor(position: dict) -> str:
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor is uncorrect")
+    if not isinstance(position, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor is uncorrect")
+    return position
+
+
+def keyset_select(model, sortable: dict, sort_by: str, cursor: str | None, limit: int,
+                  columns: tuple | None = None) -> Select:
+    if (column := sortable.get(sort_by)) is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Sort column is uncorrect")
+
+    order = (model.id,) if column is model.id else (column, model.id)
+    statement = select(*columns or (model.__table__,)).order_by(*order).limit(limit + 1)
+    if cursor is None:
+        return statement
+
+    position = decode_cursor(cursor)
+    if position.get("sort") != sort_by or not isinstance(position.get("id"), int):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor is uncorrect")
+    if column is model.id:
+        return statement.where(model.id > position["id"])
+    if type(position.get("value")) is not column.type.python_type:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor is uncorrect")
+    return statement.where(tuple_(column, model.id) > tuple_(position.get("value"), position["id"]))
+
+
+def keyset_page(items: list, sort_by: str, limit: int) -> tuple[list, str | None]:
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor({"sort": sort_by, "value": getattr(last, sort_by), "id": last.id})
+
+
+def page_response(page: BaseModel) -> Response:
+    # Returning a Response keeps FastAPI from re-validating every item against response_model;
+    # the page is built from trusted rows, so it only needs to be encoded.
+    return Response(page.json(), media_type="application/json")
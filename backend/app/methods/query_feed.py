@@ -0,0 +1,145 @@
+import json
+import asyncio
+
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import DB_ENGINE
+from app.core.db_conn import autocommit_engine
+
+from app.crud import book_query
+
+
+BOOK_QUERIES_CHANNEL = "book_queries"
+KEEPALIVE_SECONDS = 15
+REPLAY_BATCH = 500
+MAX_OUTSTANDING = 1000
+RECENT_IDS = 10000
+# Longer than any transaction that inserts into book_queries is expected to stay open.
+REPLAY_OVERLAP = timedelta(minutes=1)
+# Matches the row the notify_book_queries trigger puts in its payload.
+FEED_FIELDS = ("id", "user_id", "book_id", "type_order", "type_query", "created_at")
+
+
+class FeedSubscription:
+    def __init__(self, max_pending: int):
+        self.events: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.lagged = False
+
+
+class QueryFeed:
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._subscriptions: set[FeedSubscription] = set()
+
+    def subscribe(self) -> FeedSubscription:
+        subscription = FeedSubscription(self.max_pending)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: FeedSubscription):
+        self._subscriptions.discard(subscription)
+
+    def publish(self, payload: str):
+        event = json.loads(payload)
+        for subscription in list(self._subscriptions):
+            try:
+                subscription.events.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def disconnect_all(self):
+        for subscription in list(self._subscriptions):
+            self._drop(subscription)
+
+    def _drop(self, subscription: FeedSubscription):
+        # A slow consumer is cut off instead of buffering without bound;
+        # it reconnects with its last seen id and replays from the table.
+        subscription.lagged = True
+        self._subscriptions.discard(subscription)
+        try:
+            subscription.events.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+query_feed = QueryFeed()
+
+
+def _sse(event: str, data: dict, event_id: str | None = None) -> str:
+    message = f"event: {event}\ndata: {json.dumps(data, default=datetime.isoformat)}\n\n"
+    if event_id is not None:
+        message = f"id: {event_id}\n" + message
+    return message
+
+
+class RecentIds:
+    # Remembers the last few ids sent on a stream so overlapping replay and live events go out once.
+    def __init__(self, max_size: int):
+        self._order: deque[int] = deque()
+        self._ids: set[int] = set()
+        self.max_size = max_size
+
+    def add(self, query_id: int) -> bool:
+        if query_id in self._ids:
+            return False
+        self._ids.add(query_id)
+        self._order.append(query_id)
+        if len(self._order) > self.max_size:
+            self._ids.discard(self._order.popleft())
+        return True
+
+
+async def query_events(since: datetime | None = None, outstanding: list[int] | None = None) -> AsyncIterator[str]:
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    subscription = query_feed.subscribe()
+    sent = RecentIds(RECENT_IDS)
+    try:
+        async with AsyncSession(autocommit_engine(DB_ENGINE), expire_on_commit=False) as session:
+            # Only created rows can be replayed; queries resolved while the client was away have
+            # been deleted, so the ids it still shows as pending are checked against the table.
+            if outstanding:
+                existing = await book_query.get_existing_book_query_ids(session, outstanding)
+                for query_id in outstanding:
+                    if query_id not in existing:
+                        yield _sse("resolved", {"id": query_id})
+
+            if since is not None:
+                # Ids and created_at are assigned before commit, so a row may become visible after later
+                # ones were already sent. Replaying a window before the cursor picks such rows up.
+                created_at, last_id = since - REPLAY_OVERLAP, 0
+                while queries := await book_query.get_book_queries_after(session, created_at, last_id, REPLAY_BATCH):
+                    for query in queries:
+                        since = max(since, query.created_at)
+                        if sent.add(query.id):
+                            yield _sse("created", query.dict(include=set(FEED_FIELDS)), since.isoformat())
+                    created_at, last_id = queries[-1].created_at, queries[-1].id
+
+        while True:
+            if subscription.lagged:
+                yield _sse("lagged", {"since": since})
+                return
+            try:
+                event = await asyncio.wait_for(subscription.events.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                continue
+
+            query = event["query"]
+            if event["event"] == "created":
+                if not sent.add(query["id"]):
+                    continue
+                created_at = datetime.fromisoformat(query["created_at"])
+                since = created_at if since is None else max(since, created_at)
+                # The event id is the newest created_at seen, which is where a reconnect resumes from.
+                yield _sse("created", query, since.isoformat())
+            else:
+                yield _sse("resolved", query)
+    finally:
+        query_feed.unsubscribe(subscription)
@@ -0,0 +1,84 @@
+import json
+import heapq
+import asyncio
+import logging
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import BACKGROUND_DB_ENGINE, EnvReservationSettings
+
+from app.crud import books
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_SECONDS = 30
+
+
+class ReservationSweeper:
+    def __init__(self, settings: EnvReservationSettings | None = None):
+        self.settings = settings or EnvReservationSettings()
+        self.ttl = timedelta(minutes=self.settings.ttl_minutes)
+        self._deadlines: list[datetime] = []
+        self._wakeup = asyncio.Event()
+        self._reload = True
+
+    def schedule(self, expires_at: datetime):
+        heapq.heappush(self._deadlines, expires_at)
+        if self._deadlines[0] == expires_at:
+            self._wakeup.set()
+
+    def reload(self):
+        self._reload = True
+        self._wakeup.set()
+
+    def on_book_query(self, payload: str):
+        event = json.loads(payload)
+        if event["event"] == "created" and event["query"]["type_query"] == "Reserve":
+            self.schedule(datetime.now(timezone.utc) + self.ttl)
+
+    async def run(self):
+        while True:
+            try:
+                if self._reload:
+                    self._reload = False
+                    await self._schedule_next()
+
+                timeout = None
+                if self._deadlines:
+                    timeout = max((self._deadlines[0] - datetime.now(timezone.utc)).total_seconds(), 0)
+                self._wakeup.clear()
+                try:
+                    # Sleeps until the earliest known expiry; a new earlier one wakes us up.
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+                now = datetime.now(timezone.utc)
+                while self._deadlines and self._deadlines[0] <= now:
+                    heapq.heappop(self._deadlines)
+                await self._release(now - self.ttl)
+                await self._schedule_next()
+            except (SQLAlchemyError, OSError) as error:
+                logger.warning("Reservation sweep failed: %s", error)
+                self.schedule(datetime.now(timezone.utc) + timedelta(seconds=RETRY_SECONDS))
+
+    async def _release(self, deadline: datetime):
+        async with AsyncSession(BACKGROUND_DB_ENGINE, expire_on_commit=False) as session:
+            while True:
+                released = await books.release_expired_reservations(session, deadline, self.settings.batch_size)
+                if released:
+                    logger.info("Released %d expired reservations", len(released))
+                if len(released) < self.settings.batch_size:
+                    break
+
+    async def _schedule_next(self):
+        async with AsyncSession(BACKGROUND_DB_ENGINE, expire_on_commit=False) as session:
+            started_at = await books.get_next_reservation_start(session)
+        if started_at is not None:
+            # Rows still locked by another worker's sweep are retried shortly instead of spinning.
+            self.schedule(max(started_at + self.ttl, datetime.now(timezone.utc) + timedelta(seconds=1)))
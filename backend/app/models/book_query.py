@@ -1,14 +1,34 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Integer, String, ForeignKey
+from sqlalchemy import Integer, BigInteger, String, ForeignKey, DateTime, Index, UniqueConstraint, func, text
 
 from app.core.settings import Base
 
 
 class BookQuery(Base):
     __tablename__ = "book_queries"
+    __table_args__ = (
+        UniqueConstraint("user_id", "book_id", "type_query", name="uq_book_queries_user_book_type"),
+        Index("ix_book_queries_user_id_id", "user_id", "id"),
+        Index("ix_book_queries_book_id_id", "book_id", "id"),
+        Index("ix_book_queries_created_at_id", "created_at", "id"),
+        Index("ix_book_queries_hold_seq", "book_id", "hold_seq", unique=True,
+              postgresql_where=text("type_query = 'Hold'")),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
     book_id: Mapped[int] = mapped_column(Integer, ForeignKey("books.id"))
     type_order: Mapped[str] = mapped_column(String(10))
     type_query: Mapped[str] = mapped_column(String(10))
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # Position in the book's hold queue, assigned from hold_queues.tail_seq on enqueue.
+    hold_seq: Mapped[int | None] = mapped_column(BigInteger)
+
+
+class HoldQueue(Base):
+    __tablename__ = "hold_queues"
+
+    book_id: Mapped[int] = mapped_column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    tail_seq: Mapped[int] = mapped_column(BigInteger, server_default=text("0"))
+    # Live holds on the book, kept in step with every enqueue, cancel and pop.
+    hold_count: Mapped[int] = mapped_column(BigInteger, server_default=text("0"))
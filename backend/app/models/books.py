@@ -1,11 +1,29 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Integer, String,  ForeignKey, DateTime
+from sqlalchemy import Integer, String,  ForeignKey, DateTime, Index, text
 
 from app.core.settings import Base 
 
 
 class Books(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        Index("ix_books_name_trgm", "name",
+              postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_books_authors_trgm", "authors",
+              postgresql_using="gin", postgresql_ops={"authors": "gin_trgm_ops"}),
+        Index("ix_books_search_document", text("to_tsvector('simple', name || ' ' || authors)"),
+              postgresql_using="gin"),
+        Index("ix_books_name_id", "name", "id"),
+        Index("ix_books_authors_id", "authors", "id"),
+        Index("ix_books_overdue", "date_finish_use", "id",
+              postgresql_where=text("user_id_taken IS NOT NULL")),
+        Index("ix_books_reserved", "date_start_reserve", "id",
+              postgresql_where=text("user_reserved_id IS NOT NULL")),
+        Index("ix_books_user_id_taken", "user_id_taken",
+              postgresql_where=text("user_id_taken IS NOT NULL")),
+        Index("ix_books_user_reserved_id", "user_reserved_id",
+              postgresql_where=text("user_reserved_id IS NOT NULL")),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String)
     authors: Mapped[str] = mapped_column(String)
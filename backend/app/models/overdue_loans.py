@@ -0,0 +1,17 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, DateTime, UniqueConstraint, func
+
+from app.core.settings import Base
+
+
+class OverdueLoan(Base):
+    __tablename__ = "overdue_loans"
+    __table_args__ = (
+        UniqueConstraint("book_id", "user_id", "date_finish_use", name="uq_overdue_loans_loan"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    book_id: Mapped[int] = mapped_column(Integer)
+    user_id: Mapped[int] = mapped_column(Integer)
+    date_finish_use: Mapped[DateTime] = mapped_column(DateTime(timezone=True))
+    recorded_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -1,11 +1,19 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Integer, String, ForeignKey, DateTime
+from sqlalchemy import Integer, String, ForeignKey, DateTime, Index, text
 
 from app.core.settings import Base
 
 
 class Users(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_email_id", "email", "id"),
+        Index("ix_users_surname_id", "surname", "id"),
+        Index("ix_users_book_id_taken", "book_id_taken",
+              postgresql_where=text("book_id_taken IS NOT NULL")),
+        Index("ix_users_reserved_book_id", "reserved_book_id",
+              postgresql_where=text("reserved_book_id IS NOT NULL")),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(50))
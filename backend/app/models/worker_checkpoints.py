@@ -0,0 +1,13 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, String, DateTime, func
+
+from app.core.settings import Base
+
+
+class WorkerCheckpoint(Base):
+    __tablename__ = "worker_checkpoints"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    position_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True))
+    position_id: Mapped[int | None] = mapped_column(Integer)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,98 @@
+from typing import List
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.schemas.admin import CacheStats, PoolStats, ProfileInfo, SlowQuery
+from app.schemas.tokens import RevokeTokenModel, RevokedTokenModel
+
+from app.core.cache import cache
+from app.core.settings import DB_ENGINE, BACKGROUND_DB_ENGINE, EnvJWTSettings, EnvProfilingSettings
+from app.core.db_conn import get_async_session
+from app.core.revocation import revocations
+from app.core.security import get_current_staff
+from app.core.profiling import PROFILE_SUFFIX
+from app.core.slow_queries import slow_queries
+from app.core.replicas import replicas
+
+
+routes = APIRouter(prefix="/admin", dependencies=[Depends(get_current_staff)])
+
+
+@routes.get("/cache", response_model=CacheStats)
+async def cache_stats():
+    lookups = cache.hits + cache.misses
+    return CacheStats(backend=cache.name,
+                      size=cache.size(),
+                      max_size=cache.max_size,
+                      ttl_seconds=cache.ttl_seconds,
+                      hits=cache.hits,
+                      misses=cache.misses,
+                      hit_ratio=cache.hits / lookups if lookups else 0.0)
+
+
+def _pool_stats(name: str, engine: AsyncEngine, healthy: bool = True) -> PoolStats:
+    pool = engine.pool
+    return PoolStats(name=name,
+                     healthy=healthy,
+                     size=pool.size(),
+                     checked_in=pool.checkedin(),
+                     checked_out=pool.checkedout(),
+                     overflow=max(pool.overflow(), 0),
+                     max_overflow=pool._max_overflow,
+                     timeout=pool.timeout(),
+                     checkouts=pool.checkouts,
+                     timeouts=pool.timeouts,
+                     wait_seconds_avg=pool.wait_seconds_total / pool.checkouts if pool.checkouts else 0.0,
+                     wait_seconds_max=pool.wait_seconds_max)
+
+
+@routes.get("/pool", response_model=List[PoolStats])
+async def pool_stats():
+    return [_pool_stats("default", DB_ENGINE),
+            _pool_stats("background", BACKGROUND_DB_ENGINE),
+            *(_pool_stats(f"replica {engine.url.host}:{engine.url.port}", engine, replicas.is_healthy(engine))
+              for engine in replicas.engines)]
+
+
+profiles_directory = Path(EnvProfilingSettings().directory)
+
+
+@routes.get("/profiles", response_model=List[ProfileInfo])
+async def list_profiles():
+    if not profiles_directory.is_dir():
+        return []
+    profiles = []
+    for path in sorted(profiles_directory.glob("*" + PROFILE_SUFFIX), reverse=True):
+        stat = path.stat()
+        profiles.append(ProfileInfo(name=path.name, size=stat.st_size,
+                                    created_at=datetime.fromtimestamp(stat.st_mtime, timezone.utc)))
+    return profiles
+
+
+@routes.get("/profiles/{name}")
+async def get_profile(name: str):
+    path = profiles_directory / name
+    if path.parent != profiles_directory or not name.endswith(PROFILE_SUFFIX) or not path.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=name)
+
+
+@routes.get("/slow_queries", response_model=List[SlowQuery])
+async def list_slow_queries(limit: int = Query(50, ge=1, le=1000)):
+    return list(reversed(slow_queries.entries))[:limit]
+
+
+@routes.post("/revoked_tokens", response_model=RevokedTokenModel)
+async def revoke_token(body: RevokeTokenModel, session: AsyncSession = Depends(get_async_session)):
+    expires_at = body.expires_at or datetime.now(timezone.utc) + timedelta(
+        minutes=int(EnvJWTSettings().token_expire_minutes))
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    await revocations.revoke(session, body.jti, expires_at)
+    return RevokedTokenModel(jti=body.jti, expires_at=expires_at)
@@ -3,6 +3,7 @@ from app.routes import user
 from app.routes import book
 from app.routes import librarian 
 from app.routes import book_query 
+from app.routes import admin
 
 
 api_router = APIRouter(prefix="/api")
@@ -11,4 +12,5 @@ api_router.include_router(book.routes, tags=["books"])
 api_router.include_router(user.user_db_routes, tags=["users"])
 api_router.include_router(user.user_routes, tags=["user"])
 api_router.include_router(book_query.routes, tags=["queries"])
-api_router.include_router(librarian.routes, tags=["librarian"])
\ No newline at end of file
+api_router.include_router(librarian.routes, tags=["librarian"])
+api_router.include_router(admin.routes, tags=["admin"])
\ No newline at end of file
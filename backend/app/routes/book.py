@@ -1,19 +1,61 @@
-from fastapi import APIRouter, Depends
+from typing import Literal
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.books import BookModel, BookDBModel
+from app.schemas.books import BookModel, BookDBModel, BookPatchModel, BookPage, BookImportReport
 
 from app.crud import books
 
-from app.core.db_conn import get_async_session
+from app.models.books import Books
+
+from app.methods.export import rows_to_csv, rows_to_ndjson
+from app.methods.book_import import import_books
+from app.methods.pagination import page_response
+
+from app.core.db_conn import get_async_session, get_read_session, get_snapshot_session
 
 
 routes = APIRouter(prefix="/books")
 
 
+@routes.get("/search", response_model=BookPage)
+async def search_books(query: str = Query(min_length=1), cursor: str | None = None,
+                       limit: int = Query(10, ge=1, le=100),
+                       session: AsyncSession = Depends(get_read_session)):
+    return page_response(await books.search_book_by_title(session, query, cursor, limit))
+
+
+@routes.get("/list", response_model=BookPage)
+async def list_books(sort_by: str = "id", cursor: str | None = None,
+                     limit: int = Query(20, ge=1, le=100),
+                     session: AsyncSession = Depends(get_read_session)):
+    return page_response(await books.get_books(session, sort_by, cursor, limit))
+
+
+@routes.get("/export")
+async def export_books(format: Literal["ndjson", "csv"] = "ndjson",
+                       chunk_size: int = Query(1000, ge=1, le=10000),
+                       session: AsyncSession = Depends(get_snapshot_session)):
+    chunks = books.stream_books(session, chunk_size)
+    if format == "csv":
+        columns = [column.name for column in Books.__table__.columns]
+        return StreamingResponse(rows_to_csv(chunks, columns), media_type="text/csv",
+                                 headers={"Content-Disposition": 'attachment; filename="books.csv"'})
+    return StreamingResponse(rows_to_ndjson(chunks), media_type="application/x-ndjson")
+
+
+@routes.post("/import", response_model=BookImportReport)
+async def import_catalog(request: Request, format: Literal["ndjson", "csv"] = "ndjson",
+                         chunk_size: int = Query(1000, ge=1, le=50000), atomic: bool = True,
+                         skip_rows: int = Query(0, ge=0),
+                         session: AsyncSession = Depends(get_async_session)):
+    return await import_books(session, request.stream(), format, chunk_size, atomic, skip_rows)
+
+
 @routes.get("/action", response_model=BookDBModel)
-async def get_book(book_id: int = 0, session: AsyncSession = Depends(get_async_session)):
+async def get_book(book_id: int = 0, session: AsyncSession = Depends(get_read_session)):
     return await books.get_book_by_id(session, book_id)
 
 
@@ -31,6 +73,11 @@ async def update_book(body: BookModel, book_id: int = 0, session: AsyncSession =
     return await books.update_book(session, current_schema)
 
 
+@routes.patch("/action", response_model=BookDBModel)
+async def patch_book(body: BookPatchModel, book_id: int = 0, session: AsyncSession = Depends(get_async_session)):
+    return await books.patch_book(session, book_id, body.dict(exclude_unset=True))
+
+
 @routes.put("/action", response_model=BookModel)
 async def create_book(body: BookModel, session: AsyncSession = Depends(get_async_session)):
     return await books.create_book(session, body)
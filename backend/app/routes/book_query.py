@@ -1,19 +1,29 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.book_query import BookQueryDBModel, BookQueryModel
+from app.schemas.book_query import BookQueryDBModel, BookQueryModel, BookQueryPage, HoldPosition
+from app.schemas.tokens import ButtonData
 
 from app.crud import book_query
 
-from app.core.db_conn import get_async_session
+from app.methods.pagination import page_response
+
+from app.core.db_conn import get_async_session, get_read_session
 
 
 routes = APIRouter(prefix="/queries")
 
 
+@routes.get("/list", response_model=BookQueryPage)
+async def list_queries(sort_by: str = "id", cursor: str | None = None,
+                       limit: int = Query(20, ge=1, le=100),
+                       session: AsyncSession = Depends(get_read_session)):
+    return page_response(await book_query.get_book_queries(session, sort_by, cursor, limit))
+
+
 @routes.get("/action", response_model=BookQueryDBModel)
-async def get_query(query_id: int = 0, session: AsyncSession = Depends(get_async_session)):
+async def get_query(query_id: int = 0, session: AsyncSession = Depends(get_read_session)):
     return await book_query.get_book_query_by_id(session, query_id)
 
 
@@ -25,3 +35,23 @@ async def create_query(body: BookQueryModel, session: AsyncSession = Depends(get
 @routes.delete("/action", response_model=BookQueryDBModel)
 async def delete_query(query_id: int, session: AsyncSession = Depends(get_async_session)):
     return await book_query.delete_book_query_by_id(session, query_id)
+
+
+@routes.put("/holds", response_model=HoldPosition)
+async def enqueue_hold(body: ButtonData, session: AsyncSession = Depends(get_async_session)):
+    return await book_query.enqueue_hold(session, body.user_id, body.book_id)
+
+
+@routes.get("/holds/position", response_model=HoldPosition)
+async def get_hold_position(user_id: int, book_id: int, session: AsyncSession = Depends(get_read_session)):
+    return await book_query.get_hold_position(session, user_id, book_id)
+
+
+@routes.delete("/holds", response_model=BookQueryDBModel)
+async def cancel_hold(user_id: int, book_id: int, session: AsyncSession = Depends(get_async_session)):
+    return await book_query.cancel_hold(session, user_id, book_id)
+
+
+@routes.post("/holds/pop", response_model=BookQueryDBModel)
+async def pop_next_hold(book_id: int, session: AsyncSession = Depends(get_async_session)):
+    return await book_query.pop_next_hold(session, book_id)
@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, status
+from fastapi.responses import StreamingResponse
 
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.crud import users
+from app.crud import users, books
 
 from app.schemas.tokens import BigButtonData
-from app.schemas.book_query import BookQueryDBModel
+from app.schemas.book_query import BookQueryDBModel, BookQueryBatch, BookQueryBatchResult
+from app.schemas.books import OverdueLoanModel
 
-from app.methods.librarian import accept_reserve_book, accept_take_book, cancel_take_book
+from app.methods.librarian import accept_reserve_book, accept_take_book, cancel_take_book, accept_queries_batch
 
-from app.core.db_conn import get_async_session
+from app.methods.query_feed import query_events, MAX_OUTSTANDING
+
+from app.core.db_conn import get_async_session, get_read_session
+from app.core.security import get_current_staff
 
 
 routes = APIRouter(prefix="/librarian")
@@ -47,3 +54,26 @@ async def cancel_take_query(body: BigButtonData, session: AsyncSession = Depends
                 status_code=status.HTTP_400_BAD_REQUEST, detail="User is not a librarian.")
 
     return await cancel_take_book(body.email, body.user_id, body.book_id, session)
+
+
+@routes.post("/accept_batch", response_model=List[BookQueryBatchResult], dependencies=[Depends(get_current_staff)])
+async def accept_queries_batch_query(body: BookQueryBatch, session: AsyncSession = Depends(get_async_session)):
+    return await accept_queries_batch(body.query_ids, session)
+
+
+@routes.get("/queries/feed", dependencies=[Depends(get_current_staff)])
+async def queries_feed(since: datetime | None = None, outstanding: List[int] = Query([]),
+                       last_event_id: datetime | None = Header(None)):
+    if len(outstanding) > MAX_OUTSTANDING:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Too many outstanding queries")
+
+    return StreamingResponse(query_events(last_event_id if last_event_id is not None else since, outstanding),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@routes.get("/overdue_loans", response_model=List[OverdueLoanModel], dependencies=[Depends(get_current_staff)])
+async def overdue_loans(after_id: int = 0, limit: int = Query(100, ge=1, le=1000),
+                        session: AsyncSession = Depends(get_read_session)):
+    return await books.get_overdue_loans_after(session, after_id, limit)
@@ -1,20 +1,23 @@
-from fastapi import APIRouter, Path, Depends
+from fastapi import APIRouter, Path, Depends, Query, Response, status
 from typing import Annotated
+from datetime import datetime, timezone
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.tokens import AuthModel, Token
-from app.schemas.users import UserDBModel, UserHashedModel, UserModel
+from app.schemas.tokens import AuthModel, Token, TokenClaims
+from app.schemas.users import UserDBModel, UserHashedModel, UserModel, UserPatchModel, UserPublicModel, UserPage
 from app.schemas.tokens import ButtonData, BigButtonData
-from app.schemas.book_query import BookQueryModel, BookQueryDBModel
+from app.schemas.book_query import BookQueryModel
 
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash, check_access_token, get_token_claims
+from app.core.revocation import revocations
 
-from app.core.db_conn import get_async_session
+from app.core.db_conn import get_async_session, get_read_session
 
 from app.crud import users
 
 from app.methods.user import authenticate_user, take_book, cancel_take_book, reserve_book, cancel_reserve_book
+from app.methods.pagination import page_response
 
 
 user_routes = APIRouter(prefix="/user")
@@ -23,11 +26,18 @@ user_routes = APIRouter(prefix="/user")
 @user_routes.post("/{user_id}/token", response_model=Token)
 async def login_for_access_token(user_id: Annotated[int, Path(title="id for user")],
                                  body: AuthModel, session: AsyncSession = Depends(get_async_session)):
-    
-    user = authenticate_user(body.email, body.password, user_id, session)
+    return await authenticate_user(body.email, body.password, user_id, session)
+
+
+@user_routes.post("/token/refresh", response_model=Token)
+async def refresh_access_token(token: Token = Depends(check_access_token)):
+    return token
 
-    return Token(access_token=user.access_token,
-                 token_type="bearer")
+
+@user_routes.post("/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(claims: TokenClaims = Depends(get_token_claims), session: AsyncSession = Depends(get_async_session)):
+    await revocations.revoke(session, claims.jti, datetime.fromtimestamp(claims.exp, timezone.utc))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @user_routes.post("/send_take", response_model=BookQueryModel)
@@ -45,7 +55,7 @@ async def accept_reserve_view(body: ButtonData, session: AsyncSession = Depends(
     return await reserve_book(body.user_id, body.book_id, session)
 
 
-@user_routes.post("/cancel_reserve", response_model=BookQueryDBModel)
+@user_routes.post("/cancel_reserve", response_model=BookQueryModel)
 async def cancel_reserve_view(body: BigButtonData, session: AsyncSession = Depends(get_async_session)):
     return await cancel_reserve_book(body.email, body.user_id, body.book_id, session)
 
@@ -53,8 +63,15 @@ async def cancel_reserve_view(body: BigButtonData, session: AsyncSession = Depen
 user_db_routes = APIRouter(prefix="/users")
 
 
-@user_db_routes.get("/action", response_model=UserDBModel)
-async def get_user(user_id: int = 0, session: AsyncSession = Depends(get_async_session)):
+@user_db_routes.get("/list", response_model=UserPage)
+async def list_users(sort_by: str = "id", cursor: str | None = None,
+                     limit: int = Query(20, ge=1, le=100),
+                     session: AsyncSession = Depends(get_read_session)):
+    return page_response(await users.get_users(session, sort_by, cursor, limit))
+
+
+@user_db_routes.get("/action", response_model=UserPublicModel)
+async def get_user(user_id: int = 0, session: AsyncSession = Depends(get_read_session)):
     result = await users.get_user_by_id(session, user_id)
     return result
 
@@ -76,7 +93,7 @@ async def create_user(body: UserModel, session: AsyncSession = Depends(get_async
         reserved_book_id=body.reserved_book_id,
         access_token=body.access_token,
         time_token_create=body.time_token_create,
-        hashed_password=get_password_hash(body.password))
+        hashed_password=await get_password_hash(body.password))
     
     return await users.create_user(session, current_schema)
 
@@ -93,6 +110,15 @@ async def update_user(body: UserModel, user_id: int = 0, session: AsyncSession =
                                  reserved_book_id=body.reserved_book_id,
                                  access_token=body.access_token,
                                  time_token_create=body.time_token_create,
-                                 hashed_password=get_password_hash(body.password))
+                                 hashed_password=await get_password_hash(body.password))
     
     return await users.update_user(session, current_schema)
+
+
+@user_db_routes.patch("/action", response_model=UserPublicModel)
+async def patch_user(body: UserPatchModel, user_id: int = 0, session: AsyncSession = Depends(get_async_session)):
+    changes = body.dict(exclude_unset=True)
+    if (password := changes.pop("password", None)) is not None:
+        changes["hashed_password"] = await get_password_hash(password)
+
+    return await users.patch_user(session, user_id, changes)
@@ -0,0 +1,42 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    backend: str
+    size: int | None = None
+    max_size: int | None = None
+    ttl_seconds: int
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class PoolStats(BaseModel):
+    name: str
+    healthy: bool = True
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    timeout: float
+    checkouts: int
+    timeouts: int
+    wait_seconds_avg: float
+    wait_seconds_max: float
+
+
+class ProfileInfo(BaseModel):
+    name: str
+    size: int
+    created_at: datetime
+
+
+class SlowQuery(BaseModel):
+    statement: str
+    parameters: dict | list
+    duration_ms: float
+    recorded_at: datetime
+    host: str | None = None
+    plan: str | None = None
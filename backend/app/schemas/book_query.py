@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import List
+from datetime import datetime
+from pydantic import BaseModel, conlist
 
 
 class BookQueryModel(BaseModel):
@@ -10,6 +12,28 @@ class BookQueryModel(BaseModel):
 
 class BookQueryDBModel(BookQueryModel):
     id: int
+    created_at: datetime | None = None
 
     class Config:
         orm_mode = True
+
+
+class HoldPosition(BookQueryDBModel):
+    position: int
+    queue_length: int
+
+
+class BookQueryPage(BaseModel):
+    items: List[BookQueryDBModel]
+    next_cursor: str | None = None
+
+
+class BookQueryBatch(BaseModel):
+    query_ids: conlist(int, min_items=1, max_items=1000)
+
+
+class BookQueryBatchResult(BaseModel):
+    query_id: int
+    success: bool
+    query: BookQueryDBModel | None = None
+    detail: str | None = None
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import List
+from datetime import datetime
+from pydantic import BaseModel, validator
 
 
 class BookModel(BaseModel):
@@ -6,9 +8,9 @@ class BookModel(BaseModel):
     authors: str
     user_id_taken: int | None = None
     user_reserved_id: int | None = None
-    date_start_reserve: str | None = None
-    date_start_use: str | None = None
-    date_finish_use: str | None = None
+    date_start_reserve: datetime | None = None
+    date_start_use: datetime | None = None
+    date_finish_use: datetime | None = None
 
     class Config:
         orm_mode = True
@@ -16,3 +18,45 @@ class BookModel(BaseModel):
 
 class BookDBModel(BookModel):
     id: int
+
+
+class BookPatchModel(BaseModel):
+    name: str | None = None
+    authors: str | None = None
+    user_id_taken: int | None = None
+    user_reserved_id: int | None = None
+    date_start_reserve: datetime | None = None
+    date_start_use: datetime | None = None
+    date_finish_use: datetime | None = None
+
+    @validator("name", "authors", pre=True)
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
+
+class BookPage(BaseModel):
+    items: List[BookDBModel]
+    next_cursor: str | None = None
+
+
+class OverdueLoanModel(BaseModel):
+    id: int
+    book_id: int
+    user_id: int
+    date_finish_use: datetime
+    recorded_at: datetime
+
+
+class BookImportError(BaseModel):
+    row: int
+    detail: str
+
+
+class BookImportReport(BaseModel):
+    rows_read: int = 0
+    rows_inserted: int = 0
+    last_committed_row: int = 0
+    completed: bool = False
+    errors: List[BookImportError] = []
@@ -0,0 +1,62 @@
+from operator import itemgetter
+from typing import Generic, Iterable, Sequence, Type, TypeVar
+
+from pydantic import BaseModel
+
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class RowMapper(Generic[ModelT]):
+    # Builds schemas straight from trusted DB rows, the way BaseModel.construct does,
+    # but resolves field positions once per result shape instead of once per row.
+    def __init__(self, model: Type[ModelT]):
+        self.model = model
+        self._plans: dict[tuple[str, ...], tuple] = {}
+
+    def _plan(self, keys: tuple[str, ...]) -> tuple:
+        if (plan := self._plans.get(keys)) is None:
+            positions = {key: index for index, key in enumerate(keys)}
+            present = tuple(name for name in self.model.__fields__ if name in positions)
+            missing = tuple(field for name, field in self.model.__fields__.items() if name not in positions)
+            if required := [field.name for field in missing if field.required]:
+                raise ValueError(f"{self.model.__name__} rows lack {', '.join(required)}")
+
+            getter = _getter(tuple(positions[name] for name in present))
+            plan = self._plans[keys] = (present, getter, missing)
+        return plan
+
+    def _build(self, plan: tuple, row: Sequence) -> ModelT:
+        present, getter, missing = plan
+        values = dict(zip(present, getter(row)))
+        for field in missing:
+            values[field.name] = field.get_default()
+
+        instance = object.__new__(self.model)
+        object.__setattr__(instance, "__dict__", values)
+        object.__setattr__(instance, "__fields_set__", set(present))
+        instance._init_private_attributes()
+        return instance
+
+    def __call__(self, row) -> ModelT:
+        return self._build(self._plan(_keys(row)), row)
+
+    def all(self, rows: Iterable) -> list[ModelT]:
+        rows = list(rows)
+        if not rows:
+            return []
+        plan = self._plan(_keys(rows[0]))
+        return [self._build(plan, row) for row in rows]
+
+
+def _getter(indexes: tuple[int, ...]):
+    if len(indexes) == 1:
+        return lambda row: (row[indexes[0]],)
+    return itemgetter(*indexes) if indexes else lambda row: ()
+
+
+def _keys(row) -> tuple[str, ...]:
+    # SQLAlchemy Row exposes _fields, asyncpg Record exposes keys().
+    if (fields := getattr(row, "_fields", None)) is not None:
+        return tuple(fields)
+    return tuple(row.keys())
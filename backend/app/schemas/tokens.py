@@ -1,4 +1,5 @@
-from pydantic import BaseModel, EmailStr
+from datetime import datetime
+from pydantic import BaseModel, EmailStr, constr
 
 
 class Token(BaseModel):
@@ -16,6 +17,13 @@ class TokenData(BaseModel):
         orm_mode = True
 
 
+class TokenClaims(BaseModel):
+    sub: EmailStr
+    uid: int
+    jti: str
+    exp: int
+
+
 class BaseAuthToken(Token, TokenData):
     pass
 
@@ -35,3 +43,14 @@ class ButtonData(BaseModel):
 
 class BigButtonData(ButtonData):
     email: EmailStr
+
+
+class RevokeTokenModel(BaseModel):
+    jti: constr(min_length=1, max_length=64)
+    # Defaults to the longest a token issued now could live.
+    expires_at: datetime | None = None
+
+
+class RevokedTokenModel(BaseModel):
+    jti: str
+    expires_at: datetime
@@ -1,4 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from typing import List
+from datetime import datetime
+from pydantic import BaseModel, EmailStr, validator
 
 
 class BaseUserModel(BaseModel):
@@ -10,7 +12,7 @@ class BaseUserModel(BaseModel):
     book_id_taken: int | None = None
     reserved_book_id: int | None = None
     access_token: str | None = None
-    time_token_create: str | None = None
+    time_token_create: datetime | None = None
 
 
 class UserModel(BaseUserModel):
@@ -29,3 +31,38 @@ class UserDBModel(UserHashedModel):
 
     class Config:
         orm_mode = True
+
+
+class UserPatchModel(BaseModel):
+    name: str | None = None
+    surname: str | None = None
+    last_name: str | None = None
+    email: EmailStr | None = None
+    user_type: str | None = None
+    book_id_taken: int | None = None
+    reserved_book_id: int | None = None
+    access_token: str | None = None
+    time_token_create: datetime | None = None
+    password: str | None = None
+
+    @validator("name", "surname", "email", "user_type", "password", pre=True)
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
+
+class UserPublicModel(BaseModel):
+    id: int
+    name: str
+    surname: str
+    last_name: str | None = None
+    email: EmailStr
+    user_type: str = "User"
+    book_id_taken: int | None = None
+    reserved_book_id: int | None = None
+
+
+class UserPage(BaseModel):
+    items: List[UserPublicModel]
+    next_cursor: str | None = None
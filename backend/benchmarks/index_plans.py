@@ -0,0 +1,129 @@
+"""Show the plans of the hot foreign-key lookups.
+
+Run from the backend directory against a migrated database:
+
+    python -m benchmarks.index_plans --rows 50000
+
+Synthetic users, books and queries are seeded inside a transaction that is
+always rolled back, so the script is safe to point at a shared database.
+It exits with status 1 if any lookup still falls back to a sequential scan.
+"""
+import sys
+import json
+import asyncio
+import argparse
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.settings import DB_ENGINE
+
+
+SEED = (
+    """
+        WITH new_users AS (
+            INSERT INTO users (name, surname, email, hashed_password, user_type)
+            SELECT 'Bench', 'User ' || i, 'bench-' || i || '@example.invalid', 'bench-' || i, 'User'
+            FROM generate_series(1, :rows) AS i
+            RETURNING id
+        )
+        INSERT INTO books (id, name, authors)
+        SELECT id, 'Bench book ' || id, 'Bench author ' || id
+        FROM new_users;
+    """,
+    """
+        UPDATE books
+        SET user_id_taken = id, date_start_use = now(), date_finish_use = now() + interval '14 days'
+        WHERE id > :first_id
+        AND id % 100 = 0;
+    """,
+    """
+        UPDATE books
+        SET user_reserved_id = id, date_start_reserve = now()
+        WHERE id > :first_id
+        AND id % 100 = 1;
+    """,
+    """
+        UPDATE users
+        SET book_id_taken = CASE WHEN id % 100 = 0 THEN id END,
+            reserved_book_id = CASE WHEN id % 100 = 1 THEN id END
+        WHERE id > :first_id
+        AND id % 100 IN (0, 1);
+    """,
+    """
+        INSERT INTO book_queries (user_id, book_id, type_order, type_query)
+        SELECT id, id, 'Add', type_query
+        FROM users, unnest(ARRAY['Take', 'Hold']) AS type_query
+        WHERE id > :first_id;
+    """,
+    "ANALYZE users, books, book_queries;",
+)
+
+LOOKUPS = {
+    "book query by user and book": ("book_queries", """
+        SELECT *
+        FROM book_queries
+        WHERE user_id = :taken_id
+        AND book_id = :taken_id
+        AND type_query = 'Take'
+        ORDER BY created_at, id
+        LIMIT 1
+    """),
+    "book taken by user": ("books", "SELECT * FROM books WHERE user_id_taken = :taken_id"),
+    "book reserved by user": ("books", "SELECT * FROM books WHERE user_reserved_id = :reserved_id"),
+    "user holding book": ("users", "SELECT * FROM users WHERE book_id_taken = :taken_id"),
+    "user reserving book": ("users", "SELECT * FROM users WHERE reserved_book_id = :reserved_id"),
+}
+
+
+def _scans(plan: dict):
+    yield plan["Node Type"], plan.get("Relation Name"), plan.get("Index Name")
+    for child in plan.get("Plans", []):
+        yield from _scans(child)
+
+
+async def _explain(connection: AsyncConnection, query: str, params: dict) -> dict:
+    result = await connection.execute(text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query), params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+async def main(rows: int) -> int:
+    failed = False
+
+    async with DB_ENGINE.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            first_id = (await connection.execute(text("SELECT COALESCE(max(id), 0) FROM users;"))).scalar()
+            for statement in SEED:
+                await connection.execute(text(statement), {"rows": rows, "first_id": first_id})
+
+            # Ids ending in 00 are loans and ids ending in 01 are reservations, see SEED.
+            params = {"taken_id": first_id - first_id % 100 + 100,
+                      "reserved_id": first_id - first_id % 100 + 101}
+            for name, (table, query) in LOOKUPS.items():
+                explained = await _explain(connection, query, params)
+                scans = [(node, index) for node, relation, index in _scans(explained["Plan"])
+                         if relation == table]
+                seq_scan = any(node == "Seq Scan" for node, _ in scans)
+                failed = failed or seq_scan
+
+                plan = ", ".join(f"{node} on {index}" if index else node for node, index in scans)
+                print(f"{'FAIL' if seq_scan else 'ok  '} {name:<28} {explained['Execution Time']:>9.3f} ms  {plan}")
+        finally:
+            await transaction.rollback()
+
+    await DB_ENGINE.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000, help="synthetic users and books to seed")
+    args = parser.parse_args()
+    if args.rows < 200:
+        parser.error("--rows must be at least 200")
+
+    sys.exit(asyncio.run(main(args.rows)))
@@ -20,8 +20,8 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-from app.main import Base
-from app.models import *
+from app.core.settings import Base
+from app.models import book_query, books, overdue_loans, revoked_tokens, users, worker_checkpoints
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
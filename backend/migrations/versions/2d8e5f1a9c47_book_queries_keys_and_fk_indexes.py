@@ -0,0 +1,64 @@
+"""book queries keys and foreign key indexes
+
+Revision ID: 2d8e5f1a9c47
+Revises: e14b7d9c0f38
+Create Date: 2026-10-18 18:32:10.417552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d8e5f1a9c47'
+down_revision = 'e14b7d9c0f38'
+branch_labels = None
+depends_on = None
+
+
+FK_INDEXES = (
+    ('ix_books_user_id_taken', 'books', 'user_id_taken'),
+    ('ix_books_user_reserved_id', 'books', 'user_reserved_id'),
+    ('ix_users_book_id_taken', 'users', 'book_id_taken'),
+    ('ix_users_reserved_book_id', 'users', 'reserved_book_id'),
+)
+
+
+def upgrade() -> None:
+    # book_queries.id was created without a primary key, so it never got a serial default either.
+    op.execute("CREATE SEQUENCE IF NOT EXISTS book_queries_id_seq OWNED BY book_queries.id;")
+    op.execute("ALTER TABLE book_queries ALTER COLUMN id SET DEFAULT nextval('book_queries_id_seq');")
+    op.execute("SELECT setval('book_queries_id_seq', COALESCE((SELECT max(id) FROM book_queries), 0) + 1, false);")
+
+    op.execute("""
+        DELETE FROM book_queries a
+        USING book_queries b
+        WHERE a.id = b.id
+        AND a.ctid > b.ctid;
+    """)
+    op.execute("""
+        DELETE FROM book_queries a
+        USING book_queries b
+        WHERE a.user_id = b.user_id
+        AND a.book_id = b.book_id
+        AND a.type_query = b.type_query
+        AND a.id > b.id;
+    """)
+    op.create_primary_key('book_queries_pkey', 'book_queries', ['id'])
+    op.create_unique_constraint('uq_book_queries_user_book_type', 'book_queries',
+                                ['user_id', 'book_id', 'type_query'])
+
+    with op.get_context().autocommit_block():
+        for name, table, column in FK_INDEXES:
+            op.create_index(name, table, [column], unique=False,
+                            postgresql_where=sa.text(f'{column} IS NOT NULL'),
+                            postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, column in FK_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+    op.drop_constraint('uq_book_queries_user_book_type', 'book_queries', type_='unique')
+    op.drop_constraint('book_queries_pkey', 'book_queries', type_='primary')
@@ -0,0 +1,39 @@
+"""books search indexes
+
+Revision ID: 3f9c2a71d5e4
+Revises: 628b6d370260
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a71d5e4'
+down_revision = '628b6d370260'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+
+    # Built concurrently so that indexing a large catalog does not block writes.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_books_name_trgm', 'books', ['name'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+                        postgresql_concurrently=True)
+        op.create_index('ix_books_authors_trgm', 'books', ['authors'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'authors': 'gin_trgm_ops'},
+                        postgresql_concurrently=True)
+        op.create_index('ix_books_search_document', 'books',
+                        [sa.text("to_tsvector('simple', name || ' ' || authors)")], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_books_search_document', table_name='books', postgresql_concurrently=True)
+        op.drop_index('ix_books_authors_trgm', table_name='books', postgresql_concurrently=True)
+        op.drop_index('ix_books_name_trgm', table_name='books', postgresql_concurrently=True)
@@ -0,0 +1,37 @@
+"""overdue loans scanner
+
+Revision ID: 5e0a3b8d27c1
+Revises: c7d2e98f13a6
+Create Date: 2026-10-18 15:02:51.226473
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0a3b8d27c1'
+down_revision = 'c7d2e98f13a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('worker_checkpoints',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('position_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('position_id', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_books_overdue', 'books', ['date_finish_use', 'id'], unique=False,
+                        postgresql_where=sa.text('user_id_taken IS NOT NULL'),
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_books_overdue', table_name='books', postgresql_concurrently=True)
+    op.drop_table('worker_checkpoints')
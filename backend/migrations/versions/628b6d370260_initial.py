@@ -8,7 +8,10 @@ Create Date: 2023-07-13 03:49:01.469426
 from alembic import op
 import sqlalchemy as sa
 
-from app.core.security import get_password_hash
+from passlib.context import CryptContext
+
+# A local context keeps the migration from importing the application.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # revision identifiers, used by Alembic.
 revision = '628b6d370260'
@@ -83,7 +86,7 @@ def upgrade() -> None:
     sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
     )
     op.create_index(op.f('ix_book_queries_id'), 'book_queries', ['id'], unique=False)
-    op.execute(f"INSERT INTO users (name, surname, email, user_type, hashed_password) VALUES ('Иван', 'Иванов', 'example123@example.ru', 'Admin', '{get_password_hash('Qwerty123.')}');")
+    op.execute(f"INSERT INTO users (name, surname, email, user_type, hashed_password) VALUES ('Иван', 'Иванов', 'example123@example.ru', 'Admin', '{pwd_context.hash('Qwerty123.')}');")
     # ### end Alembic commands ###
 
 
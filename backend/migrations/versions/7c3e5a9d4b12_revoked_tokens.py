@@ -0,0 +1,49 @@
+"""revoked tokens
+
+Revision ID: 7c3e5a9d4b12
+Revises: 2d8e5f1a9c47
+Create Date: 2026-10-18 21:17:43.508219
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3e5a9d4b12'
+down_revision = '2d8e5f1a9c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('revoked_tokens',
+    sa.Column('jti', sa.String(length=64), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('jti')
+    )
+    op.create_index('ix_revoked_tokens_expires_at', 'revoked_tokens', ['expires_at'], unique=False)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_revoked_tokens() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('revoked_tokens', json_build_object(
+                'jti', NEW.jti,
+                'expires_at', NEW.expires_at
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER revoked_tokens_notify
+        AFTER INSERT ON revoked_tokens
+        FOR EACH ROW EXECUTE FUNCTION notify_revoked_tokens();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS revoked_tokens_notify ON revoked_tokens;")
+    op.execute("DROP FUNCTION IF EXISTS notify_revoked_tokens();")
+    op.drop_index('ix_revoked_tokens_expires_at', table_name='revoked_tokens')
+    op.drop_table('revoked_tokens')
@@ -0,0 +1,37 @@
+"""keyset pagination indexes
+
+Revision ID: 8b41e07c9a2d
+Revises: 3f9c2a71d5e4
+Create Date: 2026-10-18 11:03:27.540913
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41e07c9a2d'
+down_revision = '3f9c2a71d5e4'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ('ix_books_name_id', 'books', ['name', 'id']),
+    ('ix_books_authors_id', 'books', ['authors', 'id']),
+    ('ix_users_email_id', 'users', ['email', 'id']),
+    ('ix_users_surname_id', 'users', ['surname', 'id']),
+    ('ix_book_queries_user_id_id', 'book_queries', ['user_id', 'id']),
+    ('ix_book_queries_book_id_id', 'book_queries', ['book_id', 'id']),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
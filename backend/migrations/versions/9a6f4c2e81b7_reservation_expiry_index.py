@@ -0,0 +1,28 @@
+"""reservation expiry index
+
+Revision ID: 9a6f4c2e81b7
+Revises: 5e0a3b8d27c1
+Create Date: 2026-10-18 16:20:14.662091
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a6f4c2e81b7'
+down_revision = '5e0a3b8d27c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_books_reserved', 'books', ['date_start_reserve', 'id'], unique=False,
+                        postgresql_where=sa.text('user_reserved_id IS NOT NULL'),
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_books_reserved', table_name='books', postgresql_concurrently=True)
@@ -0,0 +1,32 @@
+"""overdue loans outbox
+
+Revision ID: 9d1f6b3e2a85
+Revises: 7c3e5a9d4b12
+Create Date: 2026-10-19 10:26:14.093518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d1f6b3e2a85'
+down_revision = '7c3e5a9d4b12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('overdue_loans',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date_finish_use', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('recorded_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('book_id', 'user_id', 'date_finish_use', name='uq_overdue_loans_loan')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('overdue_loans')
@@ -0,0 +1,46 @@
+"""hold queue live counts
+
+Revision ID: a6c94e2f7b18
+Revises: f3a81c5d6e20
+Create Date: 2026-10-20 11:42:07.316584
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c94e2f7b18'
+down_revision = 'f3a81c5d6e20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('hold_queues',
+                  sa.Column('hold_count', sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+    op.execute("""
+        UPDATE hold_queues queue
+        SET hold_count = (
+            SELECT count(*)
+            FROM book_queries q
+            WHERE q.book_id = queue.book_id
+            AND q.type_query = 'Hold'
+        );
+    """)
+    op.drop_column('hold_queues', 'head_seq')
+
+
+def downgrade() -> None:
+    op.add_column('hold_queues',
+                  sa.Column('head_seq', sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+    op.execute("""
+        UPDATE hold_queues queue
+        SET head_seq = COALESCE((
+            SELECT min(q.hold_seq) - 1
+            FROM book_queries q
+            WHERE q.book_id = queue.book_id
+            AND q.type_query = 'Hold'
+        ), queue.tail_seq);
+    """)
+    op.drop_column('hold_queues', 'hold_count')
@@ -0,0 +1,61 @@
+"""hold queue counters
+
+Revision ID: b4e8a2c6d913
+Revises: 9d1f6b3e2a85
+Create Date: 2026-10-19 11:04:52.671340
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e8a2c6d913'
+down_revision = '9d1f6b3e2a85'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('hold_queues',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('head_seq', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('tail_seq', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('book_id')
+    )
+    op.add_column('book_queries', sa.Column('hold_seq', sa.BigInteger(), nullable=True))
+
+    op.execute("""
+        UPDATE book_queries q
+        SET hold_seq = numbered.seq
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY book_id ORDER BY created_at, id) AS seq
+            FROM book_queries
+            WHERE type_query = 'Hold'
+        ) numbered
+        WHERE q.id = numbered.id;
+    """)
+    op.execute("""
+        INSERT INTO hold_queues (book_id, head_seq, tail_seq)
+        SELECT book_id, 0, max(hold_seq)
+        FROM book_queries
+        WHERE type_query = 'Hold'
+        GROUP BY book_id;
+    """)
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_book_queries_hold_seq', 'book_queries', ['book_id', 'hold_seq'], unique=True,
+                        postgresql_where=sa.text("type_query = 'Hold'"),
+                        postgresql_concurrently=True)
+        op.drop_index('ix_book_queries_holds', table_name='book_queries', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_book_queries_holds', 'book_queries', ['book_id', 'created_at', 'id'], unique=False,
+                        postgresql_where=sa.text("type_query = 'Hold'"),
+                        postgresql_concurrently=True)
+        op.drop_index('ix_book_queries_hold_seq', table_name='book_queries', postgresql_concurrently=True)
+    op.drop_column('book_queries', 'hold_seq')
+    op.drop_table('hold_queues')
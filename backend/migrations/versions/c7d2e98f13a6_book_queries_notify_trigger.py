@@ -0,0 +1,52 @@
+"""book queries notify trigger
+
+Revision ID: c7d2e98f13a6
+Revises: 8b41e07c9a2d
+Create Date: 2026-10-18 13:41:05.873120
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2e98f13a6'
+down_revision = '8b41e07c9a2d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_book_queries() RETURNS trigger AS $$
+        DECLARE
+            query_row book_queries;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                query_row := OLD;
+            ELSE
+                query_row := NEW;
+            END IF;
+            PERFORM pg_notify('book_queries', json_build_object(
+                'event', CASE TG_OP WHEN 'INSERT' THEN 'created' ELSE 'resolved' END,
+                'query', json_build_object(
+                    'id', query_row.id,
+                    'user_id', query_row.user_id,
+                    'book_id', query_row.book_id,
+                    'type_order', query_row.type_order,
+                    'type_query', query_row.type_query
+                )
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER book_queries_notify
+        AFTER INSERT OR DELETE ON book_queries
+        FOR EACH ROW EXECUTE FUNCTION notify_book_queries();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS book_queries_notify ON book_queries;")
+    op.execute("DROP FUNCTION IF EXISTS notify_book_queries();")
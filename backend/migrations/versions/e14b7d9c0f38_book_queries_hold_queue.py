@@ -0,0 +1,32 @@
+"""book queries hold queue
+
+Revision ID: e14b7d9c0f38
+Revises: 9a6f4c2e81b7
+Create Date: 2026-10-18 17:48:33.905217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e14b7d9c0f38'
+down_revision = '9a6f4c2e81b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('book_queries',
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_book_queries_holds', 'book_queries', ['book_id', 'created_at', 'id'], unique=False,
+                        postgresql_where=sa.text("type_query = 'Hold'"),
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_book_queries_holds', table_name='book_queries', postgresql_concurrently=True)
+    op.drop_column('book_queries', 'created_at')
@@ -0,0 +1,57 @@
+"""book queries feed cursor
+
+Revision ID: f3a81c5d6e20
+Revises: b4e8a2c6d913
+Create Date: 2026-10-20 10:15:32.904118
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a81c5d6e20'
+down_revision = 'b4e8a2c6d913'
+branch_labels = None
+depends_on = None
+
+
+NOTIFY_FUNCTION = """
+    CREATE OR REPLACE FUNCTION notify_book_queries() RETURNS trigger AS $$
+    DECLARE
+        query_row book_queries;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            query_row := OLD;
+        ELSE
+            query_row := NEW;
+        END IF;
+        PERFORM pg_notify('book_queries', json_build_object(
+            'event', CASE TG_OP WHEN 'INSERT' THEN 'created' ELSE 'resolved' END,
+            'query', json_build_object(
+                'id', query_row.id,
+                'user_id', query_row.user_id,
+                'book_id', query_row.book_id,
+                'type_order', query_row.type_order,
+                'type_query', query_row.type_query{extra_fields}
+            )
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    # The feed resumes by created_at, so live events carry it too.
+    op.execute(NOTIFY_FUNCTION.format(extra_fields=",\n                'created_at', query_row.created_at"))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_book_queries_created_at_id', 'book_queries', ['created_at', 'id'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_book_queries_created_at_id', table_name='book_queries', postgresql_concurrently=True)
+
+    op.execute(NOTIFY_FUNCTION.format(extra_fields=""))
@@ -0,0 +1,45 @@
+import os
+import asyncio
+
+import pytest
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+for name, value in {"DB_USERNAME": "library", "DB_PASSWORD": "library", "DB_HOST": "localhost",
+                    "DB_PORT": "5432", "DB_DATABASE": "library",
+                    "JWT_SECRET_KEY": "test", "JWT_ALGORITHM": "HS256"}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def db_session():
+    # Runs against the migrated database from the environment and rolls everything back afterwards.
+    from app.core.settings import DATABASE_URL, settings, create_db_engine
+
+    engine = create_db_engine(DATABASE_URL, settings, pool_size=1, max_overflow=0)
+    loop = asyncio.new_event_loop()
+
+    async def connect():
+        connection = await engine.connect()
+        await connection.begin()
+        return connection
+
+    try:
+        connection = loop.run_until_complete(connect())
+    except OSError as error:
+        loop.run_until_complete(engine.dispose())
+        loop.close()
+        pytest.skip(f"Database unavailable: {error}")
+
+    session = AsyncSession(connection, expire_on_commit=False, join_transaction_mode="create_savepoint")
+    yield loop, session
+
+    async def teardown():
+        await session.close()
+        await connection.rollback()
+        await connection.close()
+        await engine.dispose()
+
+    loop.run_until_complete(teardown())
+    loop.close()
@@ -0,0 +1,125 @@
+import asyncio
+
+from types import SimpleNamespace
+
+from asyncpg.exceptions import NotNullViolationError
+
+from app.methods.book_import import _iter_records, import_books
+
+
+def collect(chunks: list[bytes], format: str) -> list:
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def run():
+        return [record async for record in _iter_records(stream(), format)]
+
+    return asyncio.run(run())
+
+
+def test_csv_quoted_field_with_newline_and_comma():
+    body = b'name,authors\r\n"War, and\r\nPeace",Tolstoy\r\nDune,Herbert\r\n'
+
+    assert collect([body], "csv") == [
+        (1, {"name": "War, and\r\nPeace", "authors": "Tolstoy"}),
+        (2, {"name": "Dune", "authors": "Herbert"}),
+    ]
+
+
+def test_csv_record_split_across_chunks():
+    body = b'name,authors\n"He said ""hi""\nthen left",Someone\nDune,Herbert\n'
+    chunks = [body[index:index + 7] for index in range(0, len(body), 7)]
+
+    assert collect(chunks, "csv") == [
+        (1, {"name": 'He said "hi"\nthen left', "authors": "Someone"}),
+        (2, {"name": "Dune", "authors": "Herbert"}),
+    ]
+
+
+def test_csv_bare_quote_in_unquoted_field():
+    body = b'name,authors\n5" floppy,Someone\nDune,Herbert\n'
+
+    assert collect([body], "csv") == [
+        (1, {"name": '5" floppy', "authors": "Someone"}),
+        (2, {"name": "Dune", "authors": "Herbert"}),
+    ]
+
+
+def test_csv_unterminated_quote_is_reported():
+    records = collect([b'name,authors\n"Never closed,Someone\n'], "csv")
+
+    assert len(records) == 1
+    assert records[0][0] == 1
+    assert isinstance(records[0][1], ValueError)
+
+
+def test_ndjson_rows():
+    records = collect([b'{"name": "Dune", "auth', b'ors": "Herbert"}\n\nnot json\n'], "ndjson")
+
+    assert records[0] == (1, {"name": "Dune", "authors": "Herbert"})
+    assert records[1][0] == 2
+    assert isinstance(records[1][1], ValueError)
+
+
+class FakeDriver:
+    # Mimics asyncpg: COPY outside an explicit transaction commits straight away.
+    def __init__(self, fail_on_copy: int):
+        self.rows = []
+        self.pending = None
+        self.copies = 0
+        self.fail_on_copy = fail_on_copy
+
+    def transaction(self):
+        driver = self
+
+        class Transaction:
+            async def start(self):
+                driver.pending = []
+
+            async def commit(self):
+                driver.rows += driver.pending
+                driver.pending = None
+
+            async def rollback(self):
+                driver.pending = None
+
+        return Transaction()
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.copies += 1
+        if self.copies == self.fail_on_copy:
+            raise NotNullViolationError("null value in column \"name\"")
+        (self.rows if self.pending is None else self.pending).extend(records)
+
+
+class FakeSession:
+    def __init__(self, driver: FakeDriver):
+        self.driver = driver
+
+    async def connection(self):
+        async def get_raw_connection():
+            return SimpleNamespace(driver_connection=self.driver)
+        return SimpleNamespace(get_raw_connection=get_raw_connection)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+def test_failed_atomic_import_leaves_no_rows():
+    driver = FakeDriver(fail_on_copy=2)
+    body = b"".join(b'{"name": "Book %d", "authors": "Someone"}\n' % index for index in range(5))
+
+    async def stream():
+        yield body
+
+    report = asyncio.run(import_books(FakeSession(driver), stream(), "ndjson", chunk_size=2, atomic=True))
+
+    assert driver.rows == []
+    assert driver.pending is None
+    assert report.rows_inserted == 0
+    assert not report.completed
+    assert report.errors[0].row == 3
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from sqlalchemy import text
+
+from app.core.cache import cache, user_key
+from app.core.db_conn import ReadSession, autocommit_engine
+from app.core.replicas import replicas
+from app.core.settings import DATABASE_URL, settings, create_db_engine
+from app.crud import users
+
+
+def test_replica_reads_are_not_cached(monkeypatch):
+    # A second engine on the same database stands in for a replica.
+    replica = create_db_engine(DATABASE_URL, settings, pool_size=1, max_overflow=0)
+    monkeypatch.setattr(replicas, "engines", [replica])
+
+    async def run():
+        try:
+            async with ReadSession(autocommit_engine(replica)) as session:
+                if (user_id := await session.scalar(text("SELECT min(id) FROM users"))) is None:
+                    pytest.skip("No users to read")
+                await cache.delete(user_key(user_id))
+                user = await users.get_user_by_id(session, user_id)
+                return user, await cache.get(user_key(user_id))
+        finally:
+            await replica.dispose()
+
+    try:
+        user, cached = asyncio.run(run())
+    except OSError as error:
+        pytest.skip(f"Database unavailable: {error}")
+
+    assert user.id is not None
+    assert cached is None
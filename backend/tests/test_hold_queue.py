@@ -0,0 +1,53 @@
+from sqlalchemy import text
+
+from app.crud import book_query
+
+
+async def add_fixtures(session, users: int) -> tuple[int, list[int]]:
+    user_ids = []
+    for index in range(users):
+        user_ids.append(await session.scalar(text("""
+            INSERT INTO users (name, surname, email, hashed_password, user_type)
+            VALUES ('Reader', 'Reader', 'hold-queue-' || :index || '@example.invalid', 'hold-queue-' || :index, 'Client')
+            RETURNING id
+        """), {"index": str(index)}))
+    # books.id is a foreign key to users.id in the initial schema, so the book borrows a user's id.
+    book_id = await session.scalar(
+        text("INSERT INTO books (id, name, authors) VALUES (:id, 'Dune', 'Herbert') RETURNING id"), {"id": user_ids[0]})
+    return book_id, user_ids
+
+
+def test_queue_resets_after_head_popped_behind_cancelled_hold(db_session):
+    loop, session = db_session
+
+    async def run():
+        book_id, (first, second, third) = await add_fixtures(session, 3)
+        await book_query.enqueue_hold(session, first, book_id)
+        await book_query.enqueue_hold(session, second, book_id)
+        await book_query.cancel_hold(session, second, book_id)
+        await book_query.pop_next_hold(session, book_id)
+
+        return await book_query.enqueue_hold(session, third, book_id)
+
+    hold = loop.run_until_complete(run())
+
+    assert hold.position == 1
+    assert hold.queue_length == 1
+
+
+def test_cancel_from_middle_moves_holds_behind_it_up(db_session):
+    loop, session = db_session
+
+    async def run():
+        book_id, user_ids = await add_fixtures(session, 4)
+        for user_id in user_ids:
+            await book_query.enqueue_hold(session, user_id, book_id)
+        await book_query.cancel_hold(session, user_ids[1], book_id)
+
+        return [await book_query.get_hold_position(session, user_id, book_id)
+                for user_id in (user_ids[0], user_ids[2], user_ids[3])]
+
+    holds = loop.run_until_complete(run())
+
+    assert [hold.position for hold in holds] == [1, 2, 3]
+    assert [hold.queue_length for hold in holds] == [3, 3, 3]
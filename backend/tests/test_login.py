@@ -0,0 +1,24 @@
+from jose import jwt
+from sqlalchemy import text
+
+from app.core.security import get_password_hash, settings
+from app.methods.user import authenticate_user
+
+
+def test_login_issues_token_against_schema(db_session):
+    loop, session = db_session
+
+    async def run():
+        user_id = await session.scalar(text("""
+            INSERT INTO users (name, surname, email, hashed_password, user_type)
+            VALUES ('Reader', 'Reader', 'login-test@example.com', :password, 'Client')
+            RETURNING id
+        """), {"password": await get_password_hash("secret")})
+        return user_id, await authenticate_user("login-test@example.com", "secret", user_id, session)
+
+    user_id, token = loop.run_until_complete(run())
+    claims = jwt.decode(token.access_token, settings.secret_key, algorithms=[settings.algorithm])
+
+    assert len(token.access_token) > 128
+    assert claims["uid"] == user_id
+    assert claims["sub"] == "login-test@example.com"
@@ -0,0 +1,87 @@
+import json
+import asyncio
+
+from datetime import datetime, timedelta, timezone
+
+from app.crud import book_query
+from app.methods import query_feed
+from app.schemas.book_query import BookQueryDBModel
+
+
+STARTED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def book_query_row(query_id: int, created_at: datetime) -> BookQueryDBModel:
+    return BookQueryDBModel(id=query_id, user_id=1, book_id=2, type_order="reserve", type_query="take",
+                            created_at=created_at)
+
+
+def notify_payload(query: BookQueryDBModel) -> str:
+    return json.dumps({"event": "created", "query": json.loads(query.json())})
+
+
+def collect(events, count: int, publish=()) -> list[dict]:
+    async def run():
+        messages = []
+        try:
+            async for message in events:
+                if message.startswith(":"):
+                    continue
+                messages.append(message)
+                if len(messages) == 1:
+                    for payload in publish:
+                        query_feed.query_feed.publish(payload)
+                if len(messages) == count:
+                    return messages
+        finally:
+            await events.aclose()
+
+    return [json.loads(message.split("data: ", 1)[1]) for message in asyncio.run(run())]
+
+
+def test_replay_matches_notify_payload(monkeypatch):
+    queries = [book_query_row(7, STARTED)]
+
+    async def get_book_queries_after(session, created_at, last_id, limit):
+        return [query for query in queries if (query.created_at, query.id) > (created_at, last_id)]
+
+    monkeypatch.setattr(book_query, "get_book_queries_after", get_book_queries_after)
+
+    replayed, = collect(query_feed.query_events(since=STARTED), 1)
+
+    assert replayed == json.loads(notify_payload(queries[0]))["query"]
+
+
+def test_replay_overlaps_cursor_and_skips_duplicates(monkeypatch):
+    # Row 10 committed after row 11 was already sent, so it sits behind the client's cursor.
+    late, sent = book_query_row(10, STARTED), book_query_row(11, STARTED + timedelta(seconds=1))
+    newer = book_query_row(12, STARTED + timedelta(seconds=2))
+
+    async def get_book_queries_after(session, created_at, last_id, limit):
+        return [query for query in (late, sent) if (query.created_at, query.id) > (created_at, last_id)]
+
+    monkeypatch.setattr(book_query, "get_book_queries_after", get_book_queries_after)
+
+    events = collect(query_feed.query_events(since=sent.created_at), 3,
+                     publish=[notify_payload(sent), notify_payload(newer)])
+
+    assert [event["id"] for event in events] == [10, 11, 12]
+
+
+def test_live_events_out_of_id_order_are_delivered():
+    first, second = book_query_row(11, STARTED), book_query_row(10, STARTED)
+
+    # Nothing is replayed without a cursor, so publish once the stream is subscribed.
+    async def run():
+        stream = query_feed.query_events()
+        task = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+        query_feed.query_feed.publish(notify_payload(first))
+        query_feed.query_feed.publish(notify_payload(second))
+        messages = [await task, await stream.__anext__()]
+        await stream.aclose()
+        return messages
+
+    events = [json.loads(message.split("data: ", 1)[1]) for message in asyncio.run(run())]
+
+    assert [event["id"] for event in events] == [11, 10]
@@ -0,0 +1,29 @@
+import asyncio
+
+from datetime import datetime, timedelta, timezone
+
+from app.core.revocation import RevocationList
+from app.crud import revoked_tokens
+
+
+def test_load_keeps_revocations_notified_during_the_snapshot(monkeypatch):
+    revocations = RevocationList(prune_interval_seconds=300)
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+
+    async def get_active_revoked_tokens(session):
+        # Committed after the snapshot, but its NOTIFY arrives while the SELECT is awaiting.
+        revocations.add("late", expires_at)
+        return {"stored": expires_at}
+
+    monkeypatch.setattr(revoked_tokens, "get_active_revoked_tokens", get_active_revoked_tokens)
+    revocations.add("expired", datetime.now(timezone.utc) + timedelta(milliseconds=1))
+
+    async def load():
+        await asyncio.sleep(0.01)
+        await revocations.load()
+
+    asyncio.run(load())
+
+    assert "late" in revocations
+    assert "stored" in revocations
+    assert "expired" not in revocations
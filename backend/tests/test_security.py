@@ -0,0 +1,28 @@
+import asyncio
+
+import pytest
+
+from fastapi import HTTPException, status
+
+from app.core import security
+from app.crud import users
+
+
+def test_deleted_user_fails_authentication(monkeypatch):
+    token = security.create_access_token({"sub": "gone@example.com", "uid": 42})
+
+    async def get_user_by_id(session, id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    monkeypatch.setattr(users, "get_user_by_id", get_user_by_id)
+
+    async def authenticate():
+        claims = await security.get_token_claims(token)
+        assert await security.claims_cache.get(security.claims_key(token)) is not None
+        await security.get_current_user(token, claims, session=None)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(authenticate())
+
+    assert error.value.status_code == status.HTTP_401_UNAUTHORIZED
+    assert asyncio.run(security.claims_cache.get(security.claims_key(token))) is None